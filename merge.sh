@@ -0,0 +1 @@
+python3 src/merge_shards.py "$@"
\ No newline at end of file
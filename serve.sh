@@ -0,0 +1 @@
+python3 src/serve.py "$@"
\ No newline at end of file
@@ -1,7 +1,26 @@
 
 
+class _FrozenProps(dict):
+    """
+    A read-only empty props dict shared by every node created without props.
+    It still looks and compares like {} so existing code and reprs are unaffected.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared empty props are read-only; pass a props dict to the constructor instead.")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+
+EMPTY_PROPS = _FrozenProps()
+EMPTY_CHILDREN = ()
+
 
 class HTMLNode:
+    # Slots instead of a per-instance __dict__: pages hold many thousands of nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -11,6 +30,47 @@ class HTMLNode:
 
     def to_html(self):
         raise NotImplementedError("Subclasses must implement to_html() method")
+
+    def iter_html(self):
+        """
+        Yields the node's HTML in chunks, in document order.
+        The tree is walked with an explicit stack, so deep nesting cannot hit the
+        recursion limit and no subtree is ever materialised as its own string.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                # A closing tag pushed when its parent was opened
+                yield node
+            elif isinstance(node, ParentNode):
+                if not node.tag:
+                    raise ValueError("ParentNode must have a tag.")
+                yield f"<{node.tag}{node.props_to_html()}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html()
+
+    def render_to(self, stream, buffer_size=1 << 16):
+        """
+        Writes the node's HTML to a file object or buffer as it is generated.
+        Chunks are gathered into batches of about buffer_size characters, so peak
+        memory stays bounded without paying for one write() call per tag.
+        :param stream: Any object with a write() method, e.g. an open file or io.StringIO.
+        :param buffer_size: Approximate number of characters per write() call.
+        """
+        batch = []
+        size = 0
+        for chunk in self.iter_html():
+            batch.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                stream.write("".join(batch))
+                batch.clear()
+                size = 0
+        if batch:
+            stream.write("".join(batch))
     
     def props_to_html(self):
         #return f"{self.props}"
@@ -24,11 +84,17 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         if value is None:
             raise ValueError("LeafNode must have a value.")
-        # Call the parent (HTMLNode) constructor with no children (children should always be empty)
-        super().__init__(tag=tag, value=value, children=[], props=props)
+        # Leaves never have children; they share one immutable empty tuple,
+        # and nodes without props share one read-only empty dict
+        self.tag = tag
+        self.value = value
+        self.children = EMPTY_CHILDREN
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
         # If no tag is provided, return the raw value as plain text
@@ -47,21 +113,23 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         if not tag:
             raise ValueError("ParentNode must have a tag.")
         if not children:
             raise ValueError("ParentNode must have at least one child.")
 
-        # Call the parent constructor
-        super().__init__(tag=tag, value=None, children=children, props=props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
         if not self.tag:
             raise ValueError("ParentNode must have a tag.")
-        children_html = "".join(child.to_html() for child in self.children)
-        props_html = self.props_to_html()
-        return f"<{self.tag}{props_html}>{children_html}</{self.tag}>"
+        return "".join(self.iter_html())
 
     def __repr__(self):
         return (
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from markdown_to_html import markdown_to_blocks, block_to_block_type, markdown_to_html_node
+from textnode import text_to_textnodes
+from generate_pages_recursive import generate_pages_recursive
+
+WORDS = (
+    "the ring of power was forged in secret by sauron in the fires of mount doom "
+    "and hobbits of the shire carried it across middle earth to rivendell"
+).split()
+
+INLINE_STYLES = ("bold", "italic", "code", "link", "image")
+
+
+def _inline_text(rng, words, density):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < density:
+            style = rng.choice(INLINE_STYLES)
+            if style == "bold":
+                word = f"**{word}**"
+            elif style == "italic":
+                word = f"*{word}*"
+            elif style == "code":
+                word = f"`{word}`"
+            elif style == "link":
+                word = f"[{word}](/{rng.choice(WORDS)})"
+            else:
+                word = f"![{word}](/images/{rng.choice(WORDS)}.png)"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def generate_markdown(rng, blocks, density):
+    """
+    Generates one synthetic markdown page.
+    :param rng: A random.Random instance; the same seed gives the same page.
+    :param blocks: The number of blocks after the title.
+    :param density: The probability that a word carries inline formatting.
+    :return: The markdown string.
+    """
+    lines = [f"# {_inline_text(rng, 4, 0)}"]
+    for _ in range(blocks):
+        kind = rng.random()
+        if kind < 0.45:
+            lines.append(_inline_text(rng, rng.randint(20, 80), density))
+        elif kind < 0.55:
+            lines.append("#" * rng.randint(2, 6) + " " + _inline_text(rng, 5, density))
+        elif kind < 0.7:
+            marker = rng.choice(("* ", "- "))
+            items = [marker + _inline_text(rng, 8, density) for _ in range(rng.randint(2, 8))]
+            lines.append("\n".join(items))
+        elif kind < 0.8:
+            items = [f"{i}. " + _inline_text(rng, 8, density) for i in range(1, rng.randint(3, 9))]
+            lines.append("\n".join(items))
+        elif kind < 0.9:
+            items = ["> " + _inline_text(rng, 12, density) for _ in range(rng.randint(1, 4))]
+            lines.append("\n".join(items))
+        else:
+            code = [_inline_text(rng, 6, 0) for _ in range(rng.randint(2, 10))]
+            lines.append("```\n" + "\n".join(code) + "\n```")
+    return "\n\n".join(lines) + "\n"
+
+
+def adversarial_inputs(size):
+    """
+    Inline texts that stress the tokenizer: long delimiter runs and unbalanced brackets.
+    :param size: The approximate length of each input.
+    """
+    return [
+        "*" * size,
+        "`*" * (size // 2),
+        "[" * (size // 2) + "](" * (size // 4),
+        "![" * (size // 2),
+        "[a](" * (size // 4),
+        "**a *b [c](d" * (size // 12),
+    ]
+
+
+def generate_corpus(root, pages, blocks, density, seed):
+    """
+    Writes a reproducible synthetic content tree.
+    :param root: The directory to write the pages into.
+    :param pages: The number of pages.
+    :param blocks: The number of blocks per page.
+    :param density: The probability that a word carries inline formatting.
+    :param seed: The random seed.
+    :return: The list of generated markdown strings, in page order.
+    """
+    rng = random.Random(seed)
+    documents = []
+    for i in range(pages):
+        # Spread pages over nested sections, like a real content tree
+        path = os.path.join(root, f"section{i % 10}", f"part{i % 7}", f"page{i}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        markdown = generate_markdown(rng, blocks, density)
+        with open(path, 'w') as f:
+            f.write(markdown)
+        documents.append(markdown)
+    return documents
+
+
+def _best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmarks(pages, blocks, density, seed, repeat, template_path):
+    """
+    Times every build stage separately on a synthetic corpus.
+    Each stage gets precomputed inputs, so a stage's time excludes the stages before it.
+    :return: A dict mapping stage names to the best time in seconds.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        public_dir = os.path.join(tmp, "public")
+        documents = generate_corpus(content_dir, pages, blocks, density, seed)
+
+        all_blocks = [block for markdown in documents for block in markdown_to_blocks(markdown)]
+        paragraphs = [" ".join(block.split("\n")) for block in all_blocks if block_to_block_type(block) == "paragraph"]
+        trees = [markdown_to_html_node(markdown) for markdown in documents]
+        adversarial = adversarial_inputs(20000)
+
+        def build():
+            generate_pages_recursive(content_dir, template_path, public_dir)
+
+        return {
+            "markdown_to_blocks": _best_of(repeat, lambda: [markdown_to_blocks(m) for m in documents]),
+            "block_to_block_type": _best_of(repeat, lambda: [block_to_block_type(b) for b in all_blocks]),
+            "text_to_textnodes": _best_of(repeat, lambda: [text_to_textnodes(p) for p in paragraphs]),
+            "text_to_textnodes_adversarial": _best_of(repeat, lambda: [text_to_textnodes(t) for t in adversarial]),
+            "markdown_to_html_node": _best_of(repeat, lambda: [markdown_to_html_node(m) for m in documents]),
+            "to_html": _best_of(repeat, lambda: [tree.to_html() for tree in trees]),
+            "build": _best_of(repeat, build),
+        }
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: A list of (stage, baseline_seconds, current_seconds) for stages slower than
+        the baseline by more than the threshold fraction.
+    """
+    regressions = []
+    for stage, seconds in results["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is not None and seconds > previous * (1 + threshold):
+            regressions.append((stage, previous, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the build stages on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--density", type=float, default=0.15, help="fraction of words with inline formatting")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best is kept")
+    parser.add_argument("--template", default=os.path.join("static", "template.html"))
+    parser.add_argument("--baseline", default=os.path.join(".cache", "benchmark.json"))
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown per stage before failing, as a fraction (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    config = {
+        "pages": args.pages,
+        "blocks": args.blocks,
+        "density": args.density,
+        "seed": args.seed,
+    }
+    results = {
+        "config": config,
+        "python": platform.python_version(),
+        "stages": run_benchmarks(args.pages, args.blocks, args.density, args.seed, args.repeat, args.template),
+    }
+    for stage, seconds in results["stages"].items():
+        print(f"{stage:32} {seconds * 1000:10.2f} ms")
+
+    if args.save:
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+        return
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        sys.exit(f"Baseline {args.baseline} was recorded with a different corpus: {baseline.get('config')}")
+
+    regressions = compare(results, baseline, args.threshold)
+    for stage, previous, seconds in regressions:
+        print(f"REGRESSION {stage}: {previous * 1000:.2f} ms -> {seconds * 1000:.2f} ms")
+    if regressions:
+        sys.exit(1)
+    print(f"No stage regressed by more than {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
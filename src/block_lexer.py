@@ -0,0 +1,139 @@
+block_type_paragraph = "paragraph"
+block_type_heading = "heading"
+block_type_code = "code"
+block_type_quote = "quote"
+block_type_olist = "ordered_list"
+block_type_ulist = "unordered_list"
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+FENCE = "```"
+
+
+def classify_lines(lines):
+    """
+    Determines the type of a markdown block from its lines.
+    :param lines: The block's lines, with the block's outer whitespace already trimmed.
+    :return: A string representing the block type.
+    """
+    first = lines[0]
+
+    if first.startswith(HEADING_PREFIXES):
+        return block_type_heading
+
+    if first.startswith(FENCE):
+        if len(lines) > 1 and is_closing_fence(lines[-1]):
+            return block_type_code
+        # A whole code block on one line, e.g. ```code```
+        if len(lines) == 1 and len(first) >= 2 * len(FENCE) and first.endswith(FENCE):
+            return block_type_code
+
+    if first.startswith(">"):
+        for line in lines:
+            if not line.startswith(">"):
+                return block_type_paragraph
+        return block_type_quote
+
+    for marker in ("* ", "- "):
+        if first.startswith(marker):
+            for line in lines:
+                if not line.startswith(marker):
+                    return block_type_paragraph
+            return block_type_ulist
+
+    if first.startswith("1. "):
+        for i, line in enumerate(lines, 1):
+            if not line.startswith(f"{i}. "):
+                return block_type_paragraph
+        return block_type_olist
+
+    return block_type_paragraph
+
+
+def is_closing_fence(line):
+    """
+    Whether a line closes fenced code: a bare fence, optionally indented. A line
+    such as ```js or ``` text inside the code is just code.
+    """
+    return line.strip() == FENCE
+
+
+def _trimmed(lines):
+    # Same as stripping the block as a whole: only its outer edges lose whitespace
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines
+
+
+def iter_blocks(lines):
+    """
+    Splits markdown into typed blocks in a single pass over its lines.
+    Blocks are separated by blank lines, except inside fenced code, which runs to
+    its closing fence. Blocks are yielded as soon as they end, so memory is bounded
+    by the largest block rather than the whole document.
+    :param lines: Any iterable of lines, such as an open file or markdown.split("\n").
+    :return: A generator of (block_type, lines) tuples.
+    """
+    block = []
+    fenced = False
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+
+        if fenced:
+            block.append(line)
+            if is_closing_fence(line):
+                yield block_type_code, _trimmed(block)
+                block = []
+                fenced = False
+            continue
+
+        if not line.strip():
+            if block:
+                block = _trimmed(block)
+                yield classify_lines(block), block
+                block = []
+            continue
+
+        if not block and line.lstrip().startswith(FENCE):
+            opening = line.strip()
+            if len(opening) >= 2 * len(FENCE) and opening.endswith(FENCE):
+                yield block_type_code, [opening]
+                continue
+            fenced = True
+
+        block.append(line)
+
+    if fenced:
+        # The fence was never closed: it is not code, so lex what it swallowed as
+        # ordinary blocks; the opening line no longer counts as a fence.
+        paragraph = [block[0]]
+        for line in block[1:]:
+            if line.strip():
+                paragraph.append(line)
+            elif paragraph:
+                paragraph = _trimmed(paragraph)
+                yield classify_lines(paragraph), paragraph
+                paragraph = []
+        block = paragraph
+
+    if block:
+        block = _trimmed(block)
+        yield classify_lines(block), block
+
+
+def markdown_to_blocks(markdown):
+    """
+    Splits the markdown text into individual blocks separated by blank lines.
+    :param markdown: A raw markdown string.
+    :return: A list of non-empty, trimmed block strings.
+    """
+    return ["\n".join(lines) for _, lines in iter_blocks(markdown.split("\n"))]
+
+
+def block_to_block_type(block):
+    """
+    Determines the type of a markdown block based on its content.
+    :param block: A single block of markdown text (stripped of leading/trailing whitespace).
+    :return: A string representing the block type.
+    """
+    return classify_lines(block.split("\n"))
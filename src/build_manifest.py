@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+import image_probe
+import precompress
+from front_matter import scan_metadata
+from template import template_hash, template_path_for
+from textnode import image_attributes
+
+MANIFEST_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path):
+    """
+    Computes the SHA-256 hex digest of a file's contents.
+    :param path: The path to the file.
+    :return: The hex digest string.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prune_empty_dirs(path, root):
+    """
+    Removes the directories above a deleted file that are now empty, stopping at root.
+    :param path: The path of the file that was removed.
+    :param root: The directory that must be kept (e.g., 'public').
+    """
+    parent = os.path.dirname(path)
+    root = os.path.abspath(root)
+    while (
+        parent
+        and os.path.abspath(parent) != root
+        and os.path.isdir(parent)
+        and not os.listdir(parent)
+    ):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+class BuildManifest:
+    """
+    Persisted record of what each page was last built from, used by incremental builds.
+    Every entry maps a source path to its source hash, template hash, output path and
+    the attributes of the images it shows (see image_probe), which end up in its HTML.
+    The template hash is that of the page's own template (chosen in its front matter)
+    with all its layouts and partials, so editing one template only rebuilds the
+    pages that use it, and resizing an image only rebuilds the pages that show it.
+    :param template_path: The site's default template.
+    :param fresh: Ignore the saved manifest, so every page is rebuilt and recorded anew.
+    :param options: Build options that change every page's output (e.g. 'minify'); they
+        count as part of the template, so changing them rebuilds every page.
+    """
+
+    def __init__(self, manifest_path, template_path, fresh=False, options=""):
+        self.manifest_path = manifest_path
+        self.template_path = template_path
+        self.options = options
+        # Template hashes by template path, computed once per build
+        self.template_hashes = {}
+        self.pages = {} if fresh else self._load()
+        self.seen = set()
+
+    def _load(self):
+        # A missing, corrupt or outdated manifest simply means a full rebuild
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("pages", {})
+
+    def page_template_hash(self, src_path):
+        """
+        The hash of the template a page renders with, including the build options.
+        """
+        path = template_path_for(self.template_path, scan_metadata(src_path)["template"])
+        digest = self.template_hashes.get(path)
+        if digest is None:
+            digest = template_hash(path)
+            if self.options:
+                digest = hashlib.sha256(f"{digest}:{self.options}".encode()).hexdigest()
+            self.template_hashes[path] = digest
+        return digest
+
+    def is_current(self, src_path, dest_path, source_hash=None):
+        """
+        Checks whether a page's output is up to date with its inputs.
+        Marks the source as seen so it is not treated as removed.
+        :param src_path: The path to the markdown file.
+        :param dest_path: The path of the HTML file it renders to.
+        :param source_hash: The source's SHA-256 hex digest, if the caller already has it.
+        :return: A tuple (is_current, source_hash).
+        """
+        self.seen.add(src_path)
+        if source_hash is None:
+            source_hash = hash_file(src_path)
+        entry = self.pages.get(src_path)
+        current = (
+            entry is not None
+            and entry["source"] == source_hash
+            and entry["template"] == self.page_template_hash(src_path)
+            and entry["output"] == dest_path
+            and os.path.exists(dest_path)
+            and all(image_probe.image_props(url) == props for url, props in entry["images"].items())
+        )
+        return current, source_hash
+
+    def record(self, src_path, source_hash, dest_path):
+        """
+        Stores the inputs a page was just built from.
+        """
+        self.seen.add(src_path)
+        with open(src_path, 'r') as f:
+            images = dict(image_attributes(f.read()))
+        self.pages[src_path] = {
+            "source": source_hash,
+            "template": self.page_template_hash(src_path),
+            "output": dest_path,
+            "images": images,
+        }
+
+    def remove_stale(self, dest_root):
+        """
+        Deletes outputs whose sources were not seen during this build.
+        Empty directories left behind are pruned up to dest_root.
+        :param dest_root: The root of the output tree (e.g., 'public').
+        :return: A list of the removed output paths.
+        """
+        removed = []
+        for src_path in sorted(set(self.pages) - self.seen):
+            output = self.pages.pop(src_path)["output"]
+            if os.path.exists(output):
+                os.remove(output)
+                logger.info("Removed stale page: %s", output)
+            precompress.remove_compressed(output)
+            removed.append(output)
+            prune_empty_dirs(output, dest_root)
+        return removed
+
+    def save(self):
+        """
+        Writes the manifest atomically so an interrupted build cannot corrupt it.
+        """
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": MANIFEST_VERSION, "pages": self.pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,79 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Recorded trace events, or None while tracing is off (the default)
+_events = None
+
+
+def enable():
+    """
+    Starts recording spans in this process.
+    """
+    global _events
+    if _events is None:
+        _events = []
+
+
+def is_enabled():
+    return _events is not None
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    """
+    Records how long the body of a with-block takes, as a trace-event "complete" event.
+    Does nothing unless tracing was enabled.
+    :param name: The span name shown in the trace viewer (e.g. 'read').
+    :param args: Extra details attached to the event (e.g. path=...).
+    """
+    if _events is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        _events.append({
+            "name": name,
+            "cat": "build",
+            "ph": "X",
+            "ts": start / 1000,  # Microseconds, as the format expects
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+
+def take_events():
+    """
+    Returns the events recorded so far and clears them, e.g. to ship them from a
+    worker process back to the parent.
+    """
+    global _events
+    if _events is None:
+        return []
+    events, _events = _events, []
+    return events
+
+
+def add_events(events):
+    """
+    Merges events recorded elsewhere, such as in a worker process.
+    The monotonic clock is shared by all processes, so timestamps line up.
+    """
+    if _events is not None:
+        _events.extend(events)
+
+
+def save(path):
+    """
+    Writes the recorded events as a JSON trace that chrome://tracing and Perfetto load.
+    :param path: The output file (e.g. 'trace.json').
+    """
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": _events or [], "displayTimeUnit": "ms"}, f)
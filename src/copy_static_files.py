@@ -1,41 +1,266 @@
+import json
+import logging
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from build_manifest import hash_file, prune_empty_dirs
+from deploy_manifest import replace_if_changed, same_contents
+import minify
+from build_trace import span
+import precompress
+import site_archive
 
-def copy_static_files(src_dir, dest_dir):
+logger = logging.getLogger(__name__)
+
+def _is_minified(path):
+    return minify.is_enabled() and path.endswith(".css")
+
+
+def _minified_copy(src_path, dest_path):
+    # Writes the minified stylesheet, keeping an identical existing file
+    with open(src_path, 'r') as f:
+        css = f.read()
+    tmp_path = dest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(minify.cached("css", css, minify.minify_css))
+    return replace_if_changed(tmp_path, dest_path)
+
+
+def _load_record(record_path):
+    try:
+        with open(record_path, 'r') as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def _save_record(record_path, synced):
+    directory = os.path.dirname(record_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(record_path, 'w') as f:
+        json.dump(sorted(synced), f, indent=1)
+
+
+def copy_static_files(src_dir, dest_dir, clean=True, record_path=None):
     """
     Recursively copies all contents from src_dir to dest_dir.
-    Deletes everything in the dest_dir before copying.
+    Deletes everything in the dest_dir before copying, unless clean is False.
+    Files that already exist with the same contents are not rewritten. With
+    minification on, stylesheets are minified on the way. While the build goes into
+    an archive, the files are added to it instead.
     :param src_dir: The source directory (e.g., 'static')
     :param dest_dir: The destination directory (e.g., 'public')
+    :param clean: Whether to wipe dest_dir first.
+    :param record_path: Where to keep the list of copied files, so a later
+        sync_static_files removes those whose source is gone.
     """
+    archive = site_archive.get_archive()
+    if archive is not None:
+        with span("copy static"):
+            _archive_static_files(src_dir, dest_dir, archive)
+        return
+
     # Step 1: Clean the destination directory if it exists
-    if os.path.exists(dest_dir):
-        print(f"Cleaning destination directory: {dest_dir}")
+    if clean and os.path.exists(dest_dir):
+        logger.info("Cleaning destination directory: %s", dest_dir)
         shutil.rmtree(dest_dir)  # Delete the destination directory
-    os.mkdir(dest_dir)  # Recreate the destination directory
+    os.makedirs(dest_dir, exist_ok=True)  # Recreate the destination directory
 
     # Step 2: Copy all files and directories recursively
+    copied = set()
+
     def recursive_copy(src, dest):
         for item in os.listdir(src):
             src_path = os.path.join(src, item)
             dest_path = os.path.join(dest, item)
 
             if item == "template.html":
-                print(f"Skipping {src_path}")
+                logger.debug("Skipping %s", src_path)
                 continue
 
             if os.path.isdir(src_path):
                 # Create directory in the destination
-                os.mkdir(dest_path)
-                print(f"Directory created: {dest_path}")
+                os.makedirs(dest_path, exist_ok=True)
+                logger.debug("Directory created: %s", dest_path)
                 # Recursively copy the contents of the directory
                 recursive_copy(src_path, dest_path)
+                continue
+
+            copied.add(os.path.normpath(os.path.relpath(dest_path, dest_dir)))
+            if _is_minified(src_path):
+                written = _minified_copy(src_path, dest_path)
+                precompress.submit(dest_path)
+                logger.debug("File %s: %s", "minified" if written else "unchanged", dest_path)
+            elif same_contents(src_path, dest_path):
+                # Keep the existing copy (and its mtime) when the bytes match
+                precompress.submit(dest_path)
+                logger.debug("File unchanged: %s", dest_path)
             else:
                 # Copy the file to the destination
                 shutil.copy(src_path, dest_path)
-                print(f"File copied: {dest_path}")
+                precompress.submit(dest_path)
+                logger.debug("File copied: %s", dest_path)
+
+    with span("copy static"):
+        recursive_copy(src_dir, dest_dir)
+    if record_path is not None:
+        _save_record(record_path, copied)
+
+
+def _archive_static_files(src_dir, dest_dir, archive):
+    # Streams every static file into the archive, in sorted order
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name == "template.html":
+                continue
+            src_path = os.path.join(root, name)
+            dest_path = os.path.join(dest_dir, os.path.relpath(src_path, src_dir))
+            if _is_minified(src_path):
+                with open(src_path, 'r') as f:
+                    archive.write_text(dest_path, minify.cached("css", f.read(), minify.minify_css))
+            else:
+                archive.write_file(dest_path, src_path)
+            logger.debug("File archived: %s", dest_path)
+
+
+def copy_file(src_path, dest_path):
+    """
+    Copies a file's data and metadata, preferring an in-kernel copy.
+    The data goes into a temporary file that is renamed over dest_path, so a
+    hardlinked destination is replaced rather than written through to its source.
+    """
+    tmp_path = dest_path + ".tmp"
+    with open(src_path, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+        copied = False
+        if hasattr(os, "copy_file_range"):
+            # Lets the kernel copy (or reflink) without moving data through user space
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                copied = remaining == 0
+            except OSError:
+                copied = False
+        if not copied:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst, 1 << 20)
+    shutil.copystat(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def _can_link(path):
+    # A hardlinked output changes with its source, behind the back of anything derived
+    # from it, so files that get a .gz sibling are always copied
+    return not (precompress.is_enabled() and precompress.is_compressible(path))
+
+
+def _link_or_copy(src_path, dest_path, hardlink):
+    if _is_minified(src_path):
+        return "minified" if _minified_copy(src_path, dest_path) else "unchanged"
+    if hardlink and _can_link(src_path):
+        tmp_path = dest_path + ".tmp"
+        try:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            os.link(src_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return "linked"
+        except OSError:
+            # Different filesystem or no hardlink support: fall back to a copy
+            pass
+    copy_file(src_path, dest_path)
+    return "copied"
+
+
+def _is_unchanged(src_stat, src_path, dest_path, checksum):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if os.path.samestat(src_stat, dest_stat):
+        # A hardlink is always up to date, but is replaced by a copy where one can't be used
+        return _can_link(src_path)
+    if checksum:
+        return hash_file(src_path) == hash_file(dest_path)
+    return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def sync_static_files(src_dir, dest_dir, record_path, jobs=8, checksum=False, hardlink=False):
+    """
+    Brings dest_dir in line with src_dir without wiping it.
+    Only files whose size or mtime (or content hash, with checksum=True) differ are
+    copied, using a thread pool. With minification on, stylesheets are always
+    minified (from the cache when their content is known) and only written when
+    the result differs. Files synced by an earlier run whose source is gone
+    are removed; anything else in dest_dir, such as generated pages, is left alone.
+    :param src_dir: The source directory (e.g., 'static')
+    :param dest_dir: The destination directory (e.g., 'public')
+    :param record_path: Where the list of previously synced files is kept.
+    :param jobs: The number of copy threads.
+    :param checksum: Compare file contents by hash instead of trusting mtimes.
+    :param hardlink: Hardlink files instead of copying where the filesystem allows.
+        Files that get pre-compressed are always copied.
+    :return: A tuple (copied, removed) of relative paths.
+    """
+    previous = _load_record(record_path)
+
+    # Step 1: Walk the source, creating directories and collecting changed files
+    synced = set()
+    changed = []
+    current = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        rel_dir = os.path.relpath(root, src_dir)
+        os.makedirs(os.path.join(dest_dir, rel_dir), exist_ok=True)
+        for name in sorted(files):
+            src_path = os.path.join(root, name)
+            if name == "template.html":
+                logger.debug("Skipping %s", src_path)
+                continue
+            rel_path = os.path.normpath(os.path.join(rel_dir, name))
+            dest_path = os.path.join(dest_dir, rel_path)
+            synced.add(rel_path)
+            if _is_minified(src_path) or not _is_unchanged(os.stat(src_path), src_path, dest_path, checksum):
+                changed.append((rel_path, src_path, dest_path))
+            else:
+                current.append(dest_path)
+
+    # Step 2: Copy the changed files in parallel
+    with span("copy static", files=len(changed)), ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(lambda item: _link_or_copy(item[1], item[2], hardlink), changed)
+        actions = list(results)
+        for (rel_path, _, dest_path), action in zip(changed, actions):
+            if action != "unchanged":
+                precompress.submit(dest_path)
+            else:
+                precompress.submit_if_outdated(dest_path)
+            logger.debug("File %s: %s", action, dest_path)
+    for dest_path in current:
+        precompress.submit_if_outdated(dest_path)
+
+    # Step 3: Remove files whose source disappeared since the last sync
+    removed = sorted(previous - synced)
+    for rel_path in removed:
+        dest_path = os.path.join(dest_dir, rel_path)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            logger.info("Removed stale file: %s", dest_path)
+        precompress.remove_compressed(dest_path)
+        prune_empty_dirs(dest_path, dest_dir)
+
+    _save_record(record_path, synced)
 
-    recursive_copy(src_dir, dest_dir)
+    copied = [rel_path for (rel_path, _, _), action in zip(changed, actions) if action != "unchanged"]
+    return copied, removed
 
 if __name__ == "__main__":
     # Source and destination directories
@@ -43,5 +268,6 @@ if __name__ == "__main__":
     public_dir = "public"
 
     # Copy static files to public directory
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     copy_static_files(static_dir, public_dir)
-    print("Static files copied successfully!")
\ No newline at end of file
+    logger.info("Static files copied successfully!")
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+from build_manifest import hash_file, prune_empty_dirs
+
+DEPLOY_STATE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def same_contents(path_a, path_b):
+    """
+    Checks whether two files hold the same bytes, comparing sizes first.
+    A missing file never matches.
+    """
+    try:
+        if os.path.getsize(path_a) != os.path.getsize(path_b):
+            return False
+    except OSError:
+        return False
+    with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+        while True:
+            chunk_a = fa.read(1 << 16)
+            if chunk_a != fb.read(1 << 16):
+                return False
+            if not chunk_a:
+                return True
+
+
+def replace_if_changed(tmp_path, dest_path):
+    """
+    Moves a freshly written temporary file over dest_path unless dest_path already
+    holds the same bytes, in which case the temporary file is dropped and the
+    existing file (and its mtime) is kept.
+    :return: True if dest_path was written.
+    """
+    if same_contents(tmp_path, dest_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dest_path)
+    return True
+
+
+def remove_unexpected(root, expected):
+    """
+    Deletes every file under root that the build did not produce.
+    :param root: The output directory (e.g., 'public').
+    :param expected: A set of the normalized paths the build produced, joined onto root.
+    :return: A sorted list of the removed paths.
+    """
+    removed = []
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if os.path.normpath(path) not in expected:
+                removed.append(path)
+    removed.sort()
+    for path in removed:
+        os.remove(path)
+        logger.info("Removed stale output: %s", path)
+        prune_empty_dirs(path, root)
+    return removed
+
+
+def scan_outputs(root, previous):
+    """
+    Hashes every file under root. A file whose size and mtime match its previous
+    entry keeps the previous hash, so unchanged outputs are only stat'ed.
+    :param root: The output directory (e.g., 'public').
+    :param previous: The result of the previous scan.
+    :return: A dict from relative path (with / separators) to [sha256, size, mtime_ns].
+    """
+    files = {}
+    for dirpath, dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            st = os.stat(path)
+            entry = previous.get(rel_path)
+            if entry is not None and entry[1] == st.st_size and entry[2] == st.st_mtime_ns:
+                files[rel_path] = entry
+            else:
+                files[rel_path] = [hash_file(path), st.st_size, st.st_mtime_ns]
+    return files
+
+
+def diff_outputs(previous, current):
+    """
+    Compares two scans.
+    :return: A dict with "added" and "changed" (relative path -> sha256) and
+        "removed" (a sorted list of relative paths).
+    """
+    added = {}
+    changed = {}
+    for rel_path in sorted(current):
+        digest = current[rel_path][0]
+        if rel_path not in previous:
+            added[rel_path] = digest
+        elif previous[rel_path][0] != digest:
+            changed[rel_path] = digest
+    removed = sorted(set(previous) - set(current))
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def write_deploy_manifest(output_dir, state_path, manifest_path):
+    """
+    Records what changed in output_dir since the previous build, so a deploy step
+    can upload only the delta.
+    The full listing is kept at state_path for the next build; the delta is written
+    to manifest_path as {"added": {...}, "changed": {...}, "removed": [...]}.
+    :return: The delta dict.
+    """
+    # A missing, corrupt or outdated state means every output counts as added
+    try:
+        with open(state_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = None
+    if isinstance(data, dict) and data.get("version") == DEPLOY_STATE_VERSION:
+        previous = data.get("files", {})
+    else:
+        previous = {}
+
+    current = scan_outputs(output_dir, previous)
+    delta = diff_outputs(previous, current)
+
+    for path, content in ((state_path, {"version": DEPLOY_STATE_VERSION, "files": current}), (manifest_path, delta)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(content, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    logger.info(
+        "Deploy manifest: %d added, %d changed, %d removed",
+        len(delta["added"]),
+        len(delta["changed"]),
+        len(delta["removed"]),
+    )
+    return delta
@@ -0,0 +1,168 @@
+import fnmatch
+import json
+import logging
+import os
+import time
+
+SNAPSHOT_VERSION = 1
+# Hidden files and directories (.git, editor lock files such as .#page.md) are never pages
+DEFAULT_IGNORE = (".*",)
+# A directory modified this close to when it was listed may change again within the
+# same mtime tick, so its listing is not trusted on the next run
+RACY_NS = 2_000_000_000
+
+logger = logging.getLogger(__name__)
+
+
+def is_ignored(name, rel_path, patterns):
+    """
+    Whether a content file or directory matches an ignore glob. A pattern containing
+    a / is matched against the path relative to the content directory (e.g.
+    'drafts/*'); any other pattern against the name alone (e.g. '.*' or '*.draft.md').
+    :param name: The entry's name.
+    :param rel_path: Its path relative to the content directory, with / separators.
+    :param patterns: The ignore globs.
+    """
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(rel_path if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def is_ignored_path(rel_path, patterns):
+    """
+    Whether a content file is ignored, by its own name or through one of the
+    directories it is in, just as iter_markdown() would skip it.
+    :param rel_path: The path relative to the content directory, with / separators.
+    :param patterns: The ignore globs.
+    """
+    parts = rel_path.split("/")
+    for i, name in enumerate(parts):
+        if is_ignored(name, "/".join(parts[:i + 1]), patterns):
+            return True
+    return False
+
+
+class ContentScanner:
+    """
+    Finds the markdown files of the content tree with os.scandir, which reports
+    whether each entry is a file or a directory without a stat call per entry.
+    Every directory's listing can be kept in a snapshot between runs: a directory
+    whose mtime has not changed still holds the same entries, so it costs a single
+    stat instead of being listed again.
+    :param snapshot_path: The JSON file listings are kept in between runs, or None.
+    :param ignore: Globs of files and directories to skip; see is_ignored().
+    """
+
+    def __init__(self, snapshot_path=None, ignore=DEFAULT_IGNORE):
+        self.snapshot_path = snapshot_path
+        self.ignore = tuple(ignore)
+        # Directory path -> [mtime_ns, listed_at_ns, subdirectory names, markdown names]
+        self.dirs = {}
+        self.seen = set()
+        self.listed = 0
+        self.reused = 0
+        if snapshot_path is not None:
+            try:
+                with open(snapshot_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if isinstance(data, dict) and data.get("version") == SNAPSHOT_VERSION:
+                self.dirs = data["dirs"]
+
+    def _list_dir(self, path):
+        # Returns (subdirectory names, markdown names), both sorted
+        mtime = os.stat(path).st_mtime_ns
+        self.seen.add(path)
+        cached = self.dirs.get(path)
+        if cached is not None and cached[0] == mtime and mtime + RACY_NS < cached[1]:
+            self.reused += 1
+            return cached[2], cached[3]
+
+        listed_at = time.time_ns()
+        subdirs = []
+        pages = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # Symlinked directories are not followed, as with os.walk()
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    pages.append(entry.name)
+        subdirs.sort()
+        pages.sort()
+        self.dirs[path] = [mtime, listed_at, subdirs, pages]
+        self.listed += 1
+        return subdirs, pages
+
+    def iter_markdown(self, content_dir):
+        """
+        Yields the markdown files under content_dir that are not ignored, in the
+        order of a sorted os.walk(): a directory's files, then each subdirectory.
+        :param content_dir: The path to the content directory.
+        :return: A generator of (src_path, rel_path) tuples; rel_path is relative to
+            content_dir with / separators.
+        """
+        stack = [(content_dir, "")]
+        while stack:
+            path, rel_dir = stack.pop()
+            try:
+                subdirs, pages = self._list_dir(path)
+            except (FileNotFoundError, NotADirectoryError):
+                # Removed while we walked, or never there: nothing to build
+                continue
+            for name in pages:
+                if not is_ignored(name, rel_dir + name, self.ignore):
+                    yield os.path.join(path, name), rel_dir + name
+            for name in reversed(subdirs):
+                if not is_ignored(name, rel_dir + name, self.ignore):
+                    stack.append((os.path.join(path, name), rel_dir + name + "/"))
+
+    def save(self):
+        """
+        Writes the listings of the directories seen since the snapshot was loaded.
+        """
+        if self.snapshot_path is None:
+            return
+        logger.debug("Content discovery: %d directories listed, %d reused", self.listed, self.reused)
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(
+                {"version": SNAPSHOT_VERSION, "dirs": {path: self.dirs[path] for path in sorted(self.seen)}},
+                f,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.snapshot_path)
+
+
+# The scanner used by the build; without configure() it keeps no snapshot
+_scanner = ContentScanner()
+
+
+def configure(snapshot_path=None, ignore=DEFAULT_IGNORE):
+    """
+    Sets up content discovery for this process.
+    :param snapshot_path: The JSON file directory listings are kept in between runs.
+    :param ignore: Globs of content files and directories to skip.
+    """
+    global _scanner
+    _scanner = ContentScanner(snapshot_path, ignore)
+
+
+def iter_markdown(content_dir):
+    return _scanner.iter_markdown(content_dir)
+
+
+def ignores(rel_path):
+    """
+    Whether this process's discovery skips a content file; see is_ignored_path().
+    """
+    return is_ignored_path(rel_path, _scanner.ignore)
+
+
+def save():
+    _scanner.save()
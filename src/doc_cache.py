@@ -0,0 +1,188 @@
+import hashlib
+import marshal
+import os
+import threading
+from HTMLNode import LeafNode, ParentNode
+from textnode import image_attributes
+
+# Bump whenever parsing changes the node tree it builds, or entries change what
+# they hold, so entries stored by older code are never reused
+PARSER_VERSION = 3
+EXTENSION = ".marshal"
+
+
+def dump_tree(node):
+    """
+    Converts a node tree into nested tuples that marshal can store: (tag, value, props)
+    for a leaf and (tag, [children], props) for a parent, with None for empty props.
+    """
+    if isinstance(node, ParentNode):
+        return (node.tag, [dump_tree(child) for child in node.children], dict(node.props) or None)
+    return (node.tag, node.value, dict(node.props) or None)
+
+
+def load_tree(data):
+    """
+    Rebuilds the node tree stored by dump_tree().
+    """
+    tag, body, props = data
+    if isinstance(body, list):
+        return ParentNode(tag, [load_tree(child) for child in body], props)
+    return LeafNode(tag, body, props)
+
+
+class DocumentCache:
+    """
+    Persistent cache of parsed pages: the node tree, title and search terms of each
+    markdown body, marshalled into one file per body under the cache directory. Entries are keyed
+    by the SHA-256 of the body and PARSER_VERSION, so an edited page or a parser
+    change simply misses. Hits refresh the file's mtime, and evict() drops the least
+    recently used entries once the directory outgrows its budget.
+    :param cache_dir: The directory entries are stored in.
+    :param max_bytes: How large the directory may grow before evict() trims it.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, text):
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0{text}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + EXTENSION)
+
+    def parse(self, text, parse, terms=None):
+        """
+        Returns the parsed tree and title of a markdown body, parsing and storing
+        it only on a miss.
+        :param text: The markdown body, without front matter.
+        :param parse: A function from text and a dict to count its search terms into,
+            to (html_node, title), e.g. parse_markdown.
+        :param terms: Optional empty dict to fill with the body's search terms.
+        """
+        path = self._path(text)
+        images = image_attributes(text)
+        try:
+            with open(path, 'rb') as f:
+                cached_images, title, tree, cached_terms = marshal.load(f)
+            # A page's images may have been resized without the page changing
+            if cached_images == images:
+                self.hits += 1
+                os.utime(path)
+                if terms is not None:
+                    terms.update(cached_terms)
+                return load_tree(tree), title
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+
+        self.misses += 1
+        found = {}
+        html_node, title = parse(text, found)
+        if terms is not None:
+            terms.update(found)
+        data = marshal.dumps((images, title, dump_tree(html_node), found))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Unique per thread, since parallel workers may parse the same body
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return html_node, title
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits its budget.
+        :return: The number of entries removed.
+        """
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(EXTENSION):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                        total += stat.st_size
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def clear(cache_dir):
+    """
+    Deletes every cached document, and the directory if nothing else is in it.
+    :return: The number of entries removed.
+    """
+    removed = 0
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if name.endswith(EXTENSION) or name.endswith(".tmp"):
+            os.remove(os.path.join(cache_dir, name))
+            removed += name.endswith(EXTENSION)
+    if not os.listdir(cache_dir):
+        os.rmdir(cache_dir)
+    return removed
+
+
+# The cache used by the build, or None while caching is off
+_cache = None
+
+
+def enable(cache_dir, max_bytes):
+    """
+    Turns on the parsed-document cache for this process.
+    """
+    global _cache
+    _cache = DocumentCache(cache_dir, max_bytes)
+
+
+def disable():
+    global _cache
+    _cache = None
+
+
+def get_cache():
+    return _cache
+
+
+def get_settings():
+    """
+    :return: The (cache_dir, max_bytes) passed to enable(), or None while caching is off.
+    """
+    if _cache is None:
+        return None
+    return _cache.cache_dir, _cache.max_bytes
+
+
+def take_stats():
+    """
+    Returns (hits, misses) since the last call and resets the counters, e.g. to
+    ship them from a worker process back to the parent.
+    """
+    if _cache is None:
+        return 0, 0
+    stats = (_cache.hits, _cache.misses)
+    _cache.hits = _cache.misses = 0
+    return stats
+
+
+def add_stats(hits, misses):
+    """
+    Adds counters collected elsewhere, such as in a worker process.
+    """
+    if _cache is not None:
+        _cache.hits += hits
+        _cache.misses += misses
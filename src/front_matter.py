@@ -0,0 +1,173 @@
+import itertools
+import os
+import re
+from block_lexer import block_type_code, iter_blocks
+
+# Front matter sits between two of these lines at the very top of a page
+DELIMITER = "---"
+
+INTEGER_PATTERN = re.compile(r"^-?\d+$")
+BOOLEANS = {"true": True, "yes": True, "on": True, "false": False, "no": False, "off": False}
+
+# The metadata every page has, with the values used when the front matter omits them
+DEFAULT_METADATA = {"title": None, "date": None, "tags": [], "draft": False, "template": None}
+
+
+def parse_scalar(value):
+    """
+    Converts a YAML-style scalar: a quoted string, an inline [list], a boolean,
+    an integer, null or ~, or else the plain string.
+    """
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1].replace("\\" + value[0], value[0])
+    if value.startswith("[") and value.endswith("]"):
+        items = value[1:-1].strip()
+        return [parse_scalar(item.strip()) for item in items.split(",")] if items else []
+    lowered = value.lower()
+    if lowered in BOOLEANS:
+        return BOOLEANS[lowered]
+    if lowered in ("null", "~"):
+        return None
+    if INTEGER_PATTERN.match(value):
+        return int(value)
+    return value
+
+
+def parse_front_matter(lines):
+    """
+    Parses the minimal YAML subset used in front matter: "key: value" pairs, where
+    a key with no value may be followed by a block list of "- item" lines.
+    :param lines: The lines between the delimiters.
+    :return: A dict of the parsed keys.
+    :raises ValueError: If a line is neither a key nor a list item.
+    """
+    metadata = {}
+    list_key = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        if stripped.startswith("- ") or stripped == "-":
+            if list_key is None:
+                raise ValueError(f"List item outside of a list in front matter: {line!r}")
+            metadata[list_key].append(parse_scalar(stripped[1:].strip()))
+            continue
+
+        key, sep, value = line.partition(":")
+        if not sep or not key.strip():
+            raise ValueError(f"Invalid front matter line: {line!r}")
+        key = key.strip()
+        value = value.strip()
+        if value:
+            metadata[key] = parse_scalar(value)
+            list_key = None
+        else:
+            metadata[key] = []
+            list_key = key
+    return metadata
+
+
+def split_front_matter(lines):
+    """
+    Reads the front matter off the start of a page, if it has any.
+    :param lines: Any iterable of lines, such as an open file or markdown.split("\\n").
+    :return: A tuple (metadata, body_lines): the parsed front matter ({} if there is
+        none) and an iterator over the remaining lines, which have not been read yet.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.rstrip("\r\n").rstrip() != DELIMITER:
+        return {}, itertools.chain([first], lines)
+
+    header = []
+    for line in lines:
+        if line.rstrip("\r\n").rstrip() in (DELIMITER, "..."):
+            return parse_front_matter(header), lines
+        header.append(line)
+    # Never closed: it was a thematic break, not front matter
+    return {}, itertools.chain([first], header)
+
+
+def page_metadata(front_matter, body_title):
+    """
+    Combines a page's front matter with the defaults.
+    :param front_matter: The dict from split_front_matter().
+    :param body_title: The page's first h1, used when the front matter has no title.
+    :return: A dict with at least title, date, tags, draft and template.
+    """
+    metadata = dict(DEFAULT_METADATA)
+    metadata.update(front_matter)
+    if metadata["title"] is None:
+        metadata["title"] = body_title
+    elif not isinstance(metadata["title"], str):
+        metadata["title"] = str(metadata["title"])
+    # Copied, so pages never share (and mutate) the default list
+    tags = metadata["tags"]
+    metadata["tags"] = [tags] if isinstance(tags, str) else list(tags or ())
+    if metadata["date"] is not None:
+        metadata["date"] = str(metadata["date"])
+    return metadata
+
+
+def _first_heading(lines):
+    # Finds the first h1 the way parse_markdown() does, outside of fenced code. The
+    # blocks are lexed lazily, so nothing past the one holding the heading is read.
+    for block_type, block_lines in iter_blocks(lines):
+        if block_type == block_type_code:
+            continue
+        for line in block_lines:
+            if line.startswith("# "):
+                return line[2:].strip()
+    return None
+
+
+# scan_metadata() results, keyed by path and validated against mtime and size
+_scan_cache = {}
+
+
+def scan_metadata(path):
+    """
+    Reads a page's metadata without parsing its markdown: only the front matter is
+    read, plus the lines up to the first h1 when the front matter has no title.
+    Results are remembered per process until the file changes.
+    :param path: The path to the markdown file.
+    :return: A dict with title (None if there is none), date, tags, draft and template.
+    :raises ValueError: If the front matter is invalid; the message names the file.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _scan_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path, 'r') as f:
+        try:
+            front_matter, body = split_front_matter(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        body_title = None
+        if front_matter.get("title") is None:
+            body_title = _first_heading(body)
+    metadata = page_metadata(front_matter, body_title)
+    _scan_cache[path] = (key, metadata)
+    return metadata
+
+
+# Whether draft pages are built, or skipped (the default)
+_include_drafts = False
+
+
+def set_include_drafts(include):
+    global _include_drafts
+    _include_drafts = include
+
+
+def is_skipped_draft(path):
+    """
+    Whether a page is a draft that this build leaves out. Only its front matter is read.
+    """
+    return not _include_drafts and bool(scan_metadata(path)["draft"])
@@ -1,41 +1,123 @@
+import io
+import logging
 import os
 from markdown_to_html import *
+from template import load_template, template_path_for
+from front_matter import page_metadata, split_front_matter
+from deploy_manifest import replace_if_changed
+import build_trace
+import doc_cache
+import minify
+import site_archive
+from build_trace import span
 
-def generate_page(from_path, template_path, dest_path):
+logger = logging.getLogger(__name__)
+
+def generate_page(from_path, template_path, dest_path, terms=None):
     """
     Generates an HTML page from a markdown file and a template.
     :param from_path: The path to the markdown file.
-    :param template_path: The path to the HTML template file.
+    :param template_path: The path to the default HTML template file; a page may pick
+        another template by name with "template:" in its front matter.
     :param dest_path: The destination path to write the generated HTML file.
+    :param terms: Optional empty dict to fill with the page's search terms.
+    :return: True if dest_path was written, False if it already held the same HTML.
+        Pages always count as written while the build goes into an archive.
     """
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    logger.debug("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+
+    with span("page", path=from_path):
+        # Read the markdown file and convert it to an HTMLNode structure. The file is
+        # lexed line by line as it is read, so it is never held in memory as a whole;
+        # traced builds read it up front so reading gets its own span, and so does the
+        # document cache, which looks the body up by its hash.
+        cache = doc_cache.get_cache()
+        with open(from_path, 'r') as f:
+            front_matter, source = split_front_matter(f)
+            # Load the page's compiled HTML template (compiled once per build)
+            template = load_template(template_path_for(template_path, front_matter.get("template")))
+            if build_trace.is_enabled() or cache is not None:
+                with span("read"):
+                    source = "".join(source)
+            if cache is not None:
+                html_node, title = cache.parse(source, parse_markdown, terms)
+            else:
+                html_node, title = parse_markdown(source, terms)
+        # A title in the front matter wins over the first h1
+        title = page_metadata(front_matter, title)["title"]
+
+        if minify.is_enabled():
+            with span("minify"):
+                minify.minify_tree(html_node)
+
+        if title is None:
+            raise Exception("No h1 header found in markdown")
 
-    # Read the markdown file
-    with open(from_path, 'r') as f:
-        markdown_content = f.read()
+        def render_content(stream):
+            with span("render"):
+                html_node.render_to(stream)
 
-    # Read the HTML template file
-    with open(template_path, 'r') as f:
-        template_content = f.read()
+        archive = site_archive.get_archive()
+        if archive is not None:
+            # Archive builds add the page as an entry instead of writing a file
+            buffer = io.StringIO()
+            with span("template fill"):
+                template.render_to(buffer, {"Title": title, "Content": render_content})
+            with span("write", path=dest_path):
+                archive.write_text(dest_path, buffer.getvalue())
+            logger.debug("Page archived: %s", dest_path)
+            return True
 
-    # Convert markdown to HTMLNode structure
-    html_node = markdown_to_html_node(markdown_content)
+        # Ensure the destination directory exists
+        with span("write", path=dest_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    # Convert the HTMLNode to HTML string
-    html_content = html_node.to_html()
+            # Fill the template slots and stream the final HTML to a temporary file;
+            # the page body is written chunk by chunk straight from the node tree
+            tmp_path = dest_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                with span("template fill"):
+                    template.render_to(f, {"Title": title, "Content": render_content})
 
-    # Extract title from markdown
-    title = extract_title(markdown_content)
+            # Keep an identical existing page untouched so its mtime stays the same
+            written = replace_if_changed(tmp_path, dest_path)
 
-    # Replace placeholders in the template
-    final_content = template_content.replace("{{ Title }}", title)
-    final_content = final_content.replace("{{ Content }}", html_content)
+    if written:
+        logger.debug("Page generated at %s", dest_path)
+    else:
+        logger.debug("Page unchanged: %s", dest_path)
+    return written
 
-    # Ensure the destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    # Write the final HTML to the destination file
-    with open(dest_path, 'w') as f:
-        f.write(final_content)
+def render_page(source, template_path, terms=None):
+    """
+    Renders a markdown document into the final HTML of its page, in memory.
+    Used by the pipelined build, which reads and writes files on other threads.
+    :param source: The markdown text.
+    :param template_path: The path to the default HTML template file.
+    :param terms: Optional empty dict to fill with the page's search terms.
+    :return: The page's HTML string.
+    """
+    front_matter, lines = split_front_matter(source.split("\n"))
+    template = load_template(template_path_for(template_path, front_matter.get("template")))
+    cache = doc_cache.get_cache()
+    if cache is not None:
+        # The same body text generate_page() looks up, so both builds share entries
+        html_node, title = cache.parse("\n".join(lines), parse_markdown, terms)
+    else:
+        html_node, title = parse_markdown(lines, terms)
+    title = page_metadata(front_matter, title)["title"]
+    if minify.is_enabled():
+        with span("minify"):
+            minify.minify_tree(html_node)
+    if title is None:
+        raise Exception("No h1 header found in markdown")
+
+    def render_content(stream):
+        with span("render"):
+            html_node.render_to(stream)
 
-    print(f"Page generated at {dest_path}")
+    buffer = io.StringIO()
+    with span("template fill"):
+        template.render_to(buffer, {"Title": title, "Content": render_content})
+    return buffer.getvalue()
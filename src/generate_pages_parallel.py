@@ -0,0 +1,198 @@
+import logging
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from generate_page import generate_page, render_page
+from front_matter import is_skipped_draft
+import build_trace
+import discovery
+import doc_cache
+import image_probe
+import inline_cache
+import minify
+import precompress
+import search_index
+import sharding
+import site_archive
+import template
+from build_trace import span
+
+logger = logging.getLogger(__name__)
+
+
+class PageBuildError(Exception):
+    """
+    Raised after a parallel build when one or more pages failed to render.
+    :param failures: A list of (src_path, traceback_text) tuples, in discovery order.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        details = "\n".join(f"{path}:\n{error}" for path, error in failures)
+        super().__init__(f"{len(failures)} page(s) failed to build:\n{details}")
+
+
+def iter_pages(dir_path_content, dest_dir_path):
+    """
+    Walks the content directory and yields every markdown page to build as it is found.
+    Ignored files are left out (see discovery), and so are drafts unless the build
+    includes them; telling costs a front matter read.
+    Pages come in walk order: a directory's files, then each of its subdirectories.
+    Every build mode builds, and archives, pages in this order, so an archive comes
+    out the same however it was built.
+    :param dir_path_content: The path to the content directory.
+    :param dest_dir_path: The path to the public directory.
+    :return: A generator of (src_path, dest_path) tuples.
+    """
+    for src_path, rel_path in discovery.iter_markdown(dir_path_content):
+        if is_skipped_draft(src_path):
+            continue
+        # Only the extension is swapped, so docs.md.d/page.md keeps its directory name
+        dest_path = os.path.normpath(os.path.join(dest_dir_path, *rel_path[:-len(".md")].split("/")) + ".html")
+        yield src_path, dest_path
+
+
+def discover_pages(dir_path_content, dest_dir_path):
+    """
+    Walks the content directory and lists every markdown page to build.
+    :param dir_path_content: The path to the content directory.
+    :param dest_dir_path: The path to the public directory.
+    :return: A sorted list of (src_path, dest_path) tuples.
+    """
+    return sorted(iter_pages(dir_path_content, dest_dir_path))
+
+
+class _RecordCollector(logging.Handler):
+    # Holds a worker's log records until they are sent back with the page result
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Format now: args and exc_info may not survive pickling
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+_collector = None
+
+
+def _init_worker(log_level, tracing, inline_cache_chars, image_settings, minify_cache_dir, template_dir, doc_cache_settings):
+    # Workers never write logs themselves; records go back to the parent, which
+    # emits them in discovery order so the output is the same on every run.
+    global _collector
+    _collector = _RecordCollector()
+    root = logging.getLogger()
+    root.handlers[:] = [_collector]
+    root.setLevel(log_level)
+    # Drop any events inherited from the parent through fork
+    build_trace.take_events()
+    if tracing:
+        build_trace.enable()
+    if inline_cache_chars:
+        inline_cache.enable(inline_cache_chars)
+    if image_settings:
+        image_probe.enable(*image_settings)
+    if minify_cache_dir:
+        minify.enable(minify_cache_dir)
+    template.set_template_dir(template_dir)
+    if doc_cache_settings:
+        doc_cache.enable(*doc_cache_settings)
+
+
+def _render_page(task):
+    # Runs in a worker process: collect the page's log records, trace events,
+    # cache counters, new image probes, search terms and any error so the parent can
+    # report them in a deterministic order. Archive builds get the HTML back too, since only the
+    # parent can write to the archive.
+    src_path, template_path, dest_path, in_memory = task
+    _collector.records = []
+    html = None
+    terms = {}
+    try:
+        if in_memory:
+            with span("page", path=src_path):
+                with open(src_path, 'r') as f:
+                    html = render_page(f.read(), template_path, terms)
+        else:
+            generate_page(src_path, template_path, dest_path, terms)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    stats = inline_cache.take_stats()
+    doc_stats = doc_cache.take_stats()
+    images = image_probe.take_new_entries()
+    return src_path, dest_path, _collector.records, build_trace.take_events(), stats, doc_stats, images, terms, html, error
+
+
+def generate_pages_parallel(dir_path_content, template_path, dest_dir_path, jobs, manifest=None):
+    """
+    Generates every page in the content directory using a pool of worker processes.
+    Pages are discovered up front, rendered in parallel and reported in discovery order
+    (that of iter_pages()).
+    A sharded build (see sharding.set_shard) only generates the pages of its shard.
+    :param dir_path_content: The path to the content directory.
+    :param template_path: The path to the default HTML template file.
+    :param dest_dir_path: The path to the public directory where the HTML files will be generated.
+    :param jobs: The number of worker processes.
+    :param manifest: Optional BuildManifest; pages whose inputs are unchanged are skipped.
+    :raises PageBuildError: If any page failed, after all other pages have been built.
+    """
+    with span("discover", path=dir_path_content):
+        pages = [page for page in iter_pages(dir_path_content, dest_dir_path) if sharding.includes(page[0])]
+
+    archive = site_archive.get_archive()
+    tasks = []
+    source_hashes = {}
+    for src_path, dest_path in pages:
+        if manifest is not None:
+            current, source_hashes[src_path] = manifest.is_current(src_path, dest_path)
+            if current:
+                logger.debug("Unchanged, skipping: %s", src_path)
+                precompress.submit_if_outdated(dest_path)
+                continue
+        tasks.append((src_path, template_path, dest_path, archive is not None))
+
+    if not tasks:
+        return
+
+    failures = []
+    # Hand out several pages per round trip so small pages don't drown in IPC overhead
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            logging.getLogger().getEffectiveLevel(),
+            build_trace.is_enabled(),
+            inline_cache.get_cache().max_chars if inline_cache.get_cache() else 0,
+            image_probe.get_settings(),
+            minify.get_settings(),
+            template.get_template_dir(),
+            doc_cache.get_settings(),
+        ),
+    ) as executor:
+        results = executor.map(_render_page, tasks, chunksize=chunksize)
+        for src_path, dest_path, records, events, stats, doc_stats, images, terms, html, error in results:
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            build_trace.add_events(events)
+            inline_cache.add_stats(*stats)
+            doc_cache.add_stats(*doc_stats)
+            image_probe.add_entries(images)
+            if error is not None:
+                failures.append((src_path, error))
+                continue
+            if html is not None:
+                # Entries are added here, in discovery order, so the archive is reproducible
+                archive.write_text(dest_path, html)
+            if manifest is not None:
+                manifest.record(src_path, source_hashes[src_path], dest_path)
+            search_index.record_terms(src_path, terms)
+            precompress.submit(dest_path)
+            logger.debug("Generated HTML page: %s", dest_path)
+
+    if failures:
+        raise PageBuildError(failures)
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from deploy_manifest import replace_if_changed
+from generate_page import render_page
+from generate_pages_parallel import PageBuildError, iter_pages
+from build_trace import span
+import precompress
+import search_index
+import sharding
+import site_archive
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the discovery queue
+_DONE = None
+
+
+class DirectoryCache:
+    """
+    Creates each output directory once, no matter how many pages are written into
+    it or how many threads ask for it.
+    """
+
+    def __init__(self):
+        self.created = set()
+        self.lock = threading.Lock()
+
+    def ensure(self, path):
+        # makedirs runs under the lock, so no thread writes into a directory that
+        # another thread is still creating
+        with self.lock:
+            if path not in self.created:
+                os.makedirs(path, exist_ok=True)
+                self.created.add(path)
+
+
+def _discover(dir_path_content, dest_dir_path, pages):
+    # Discovery stage: walk the content tree on its own thread. An error is handed to
+    # the renderer through the queue, since a walk that stopped early must never look
+    # like pages that no longer exist.
+    try:
+        with span("discover", path=dir_path_content):
+            for page in iter_pages(dir_path_content, dest_dir_path):
+                if sharding.includes(page[0]):
+                    pages.put(page)
+    except Exception as e:
+        pages.put(e)
+    finally:
+        pages.put(_DONE)
+
+
+def _read_source(src_path):
+    # Read-ahead stage: load and hash a source on an I/O thread
+    with span("read", path=src_path):
+        with open(src_path, 'rb') as f:
+            data = f.read()
+    return data.decode(), hashlib.sha256(data).hexdigest()
+
+
+def _write_page(dest_path, html, directories):
+    # Write stage: store a rendered page on an I/O thread, keeping identical files
+    with span("write", path=dest_path):
+        directories.ensure(os.path.dirname(dest_path))
+        tmp_path = dest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(html)
+        return replace_if_changed(tmp_path, dest_path)
+
+
+def generate_pages_pipelined(dir_path_content, template_path, dest_dir_path, manifest=None, io_threads=8, depth=32):
+    """
+    Generates every page in the content directory as a pipeline of stages: discovery,
+    read-ahead, parse and render, and write. Discovery runs on its own thread and
+    reading and writing on a pool of I/O threads, connected by bounded queues, while
+    this thread parses and renders. Slow storage then overlaps with rendering, so the
+    wall time approaches the larger of the two instead of their sum.
+    Pages are rendered and reported in discovery order.
+    A sharded build (see sharding.set_shard) only generates the pages of its shard.
+    :param dir_path_content: The path to the content directory.
+    :param template_path: The path to the default HTML template file.
+    :param dest_dir_path: The path to the public directory where the HTML files will be generated.
+    :param manifest: Optional BuildManifest; pages whose inputs are unchanged are skipped.
+    :param io_threads: The number of threads reading sources and writing pages.
+    :param depth: How many pages each stage may run ahead of the next, which bounds
+        the memory held by pages in flight.
+    :raises PageBuildError: If any page failed, after all other pages have been built.
+    :raises Exception: Whatever stopped discovery, after the pages found before it were built.
+    """
+    directories = DirectoryCache()
+    archive = site_archive.get_archive()
+    failures = []
+
+    pages = queue.Queue(maxsize=depth)
+    discovery = threading.Thread(
+        target=_discover,
+        args=(dir_path_content, dest_dir_path, pages),
+        name="discover",
+        daemon=True,
+    )
+    discovery.start()
+
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="page-io") as io_pool:
+        reads = deque()
+        writes = deque()
+        discovering = True
+        discovery_error = None
+
+        def finish_write():
+            # Waits for the oldest write, so results are handled in discovery order
+            src_path, dest_path, source_hash, terms, future = writes.popleft()
+            try:
+                written = future.result()
+            except Exception:
+                failures.append((src_path, traceback.format_exc()))
+                return
+            if manifest is not None:
+                manifest.record(src_path, source_hash, dest_path)
+            search_index.record_terms(src_path, terms)
+            precompress.submit(dest_path)
+            logger.debug("Generated HTML page: %s" if written else "Page unchanged: %s", dest_path)
+
+        while True:
+            # Keep up to depth sources being read ahead of the renderer
+            while discovering and len(reads) < depth:
+                page = pages.get()
+                if page is _DONE:
+                    discovering = False
+                    break
+                if isinstance(page, Exception):
+                    discovery_error = page
+                    continue
+                reads.append((page, io_pool.submit(_read_source, page[0])))
+            if not reads:
+                break
+
+            (src_path, dest_path), future = reads.popleft()
+            try:
+                source, source_hash = future.result()
+                if manifest is not None:
+                    current, _ = manifest.is_current(src_path, dest_path, source_hash)
+                    if current:
+                        logger.debug("Unchanged, skipping: %s", src_path)
+                        precompress.submit_if_outdated(dest_path)
+                        continue
+                terms = {}
+                with span("page", path=src_path):
+                    html = render_page(source, template_path, terms)
+            except Exception:
+                failures.append((src_path, traceback.format_exc()))
+                continue
+
+            if archive is not None:
+                # An archive takes its entries one at a time, on this thread and in
+                # discovery order, so the archive comes out the same on every run
+                write = Future()
+                with span("write", path=dest_path):
+                    archive.write_text(dest_path, html)
+                write.set_result(True)
+            else:
+                write = io_pool.submit(_write_page, dest_path, html, directories)
+            writes.append((src_path, dest_path, source_hash, terms, write))
+            if len(writes) > depth:
+                finish_write()
+
+        while writes:
+            finish_write()
+
+    discovery.join()
+    if discovery_error is not None:
+        # Raised before anything can treat the undiscovered pages as removed
+        raise discovery_error
+    if failures:
+        raise PageBuildError(failures)
@@ -1,26 +1,51 @@
-import os
+import logging
 from generate_page import generate_page
+from generate_pages_parallel import iter_pages
+import build_trace
+import precompress
+import search_index
+import sharding
+from build_trace import span
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
+logger = logging.getLogger(__name__)
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, manifest=None):
     """
     Recursively generates HTML files for every markdown file in the content directory.
+    A sharded build (see sharding.set_shard) only generates the pages of its shard.
     :param dir_path_content: The path to the content directory.
     :param template_path: The path to the HTML template file.
     :param dest_dir_path: The path to the public directory where the HTML files will be generated.
+    :param manifest: Optional BuildManifest; pages whose inputs are unchanged are skipped.
     """
-    for item in os.listdir(dir_path_content):
-        src_item_path = os.path.join(dir_path_content, item)
-        dest_item_path = os.path.join(dest_dir_path, item)
+    # Discovery is lazy: each page is built as soon as it is found, in walk order
+    # (a directory's files, then its subdirectories; see iter_pages).
+    # Traced builds discover up front so discovery gets a span of its own.
+    pages = iter_pages(dir_path_content, dest_dir_path)
+    if build_trace.is_enabled():
+        with span("discover", path=dir_path_content):
+            pages = list(pages)
+    for src_item_path, html_file_path in pages:
+        if not sharding.includes(src_item_path):
+            continue
+
+        if manifest is None:
+            terms = {}
+            generate_page(src_item_path, template_path, html_file_path, terms)
+            search_index.record_terms(src_item_path, terms)
+            precompress.submit(html_file_path)
+            logger.debug("Generated HTML page: %s", html_file_path)
+            continue
 
-        # If the item is a directory, recurse into it
-        if os.path.isdir(src_item_path):
-            # Recursively create subdirectories in the destination
-            os.makedirs(dest_item_path, exist_ok=True)
-            generate_pages_recursive(src_item_path, template_path, dest_item_path)
-        
-        # If the item is a markdown file, generate the corresponding HTML file
-        elif os.path.isfile(src_item_path) and src_item_path.endswith(".md"):
-            # Convert .md file to .html
-            html_file_path = dest_item_path.replace(".md", ".html")
-            generate_page(src_item_path, template_path, html_file_path)
-            print(f"Generated HTML page: {html_file_path}")
+        # Incremental build: only re-render pages whose inputs changed
+        current, source_hash = manifest.is_current(src_item_path, html_file_path)
+        if current:
+            logger.debug("Unchanged, skipping: %s", src_item_path)
+            precompress.submit_if_outdated(html_file_path)
+            continue
+        terms = {}
+        generate_page(src_item_path, template_path, html_file_path, terms)
+        search_index.record_terms(src_item_path, terms)
+        manifest.record(src_item_path, source_hash, html_file_path)
+        precompress.submit(html_file_path)
+        logger.debug("Generated HTML page: %s", html_file_path)
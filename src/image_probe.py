@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import struct
+
+CACHE_VERSION = 1
+
+# JPEG start-of-frame markers, which carry the image size (DHT, JPG and DAC share the range)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+logger = logging.getLogger(__name__)
+
+
+def _probe_png(f, head):
+    # The IHDR chunk always comes first: width and height follow its type
+    if len(head) >= 24 and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+
+def _probe_gif(f, head):
+    # The logical screen size follows the 6-byte signature
+    if len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+
+def _probe_jpeg(f, head):
+    # Walk the marker segments until a start-of-frame segment
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            # Standalone markers have no length
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan: no frame header before the data
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def probe_dimensions(path):
+    """
+    Reads the intrinsic size of a PNG, JPEG or GIF image from its header.
+    :param path: The path to the image file.
+    :return: A (width, height) tuple, or None if the format is not recognised.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _probe_png(f, head)
+        if head.startswith((b"GIF87a", b"GIF89a")):
+            return _probe_gif(f, head)
+        if head.startswith(b"\xff\xd8"):
+            return _probe_jpeg(f, head)
+    return None
+
+
+class ImageSizes:
+    """
+    Resolves site-root image URLs against the static directory and remembers their
+    dimensions on disk, keyed by path and mtime, so unchanged images are never reopened.
+    :param static_dir: The directory that is copied to the site root.
+    :param cache_path: The JSON file holding probe results between builds.
+    """
+
+    def __init__(self, static_dir, cache_path):
+        self.static_dir = static_dir
+        self.cache_path = cache_path
+        self.entries = {}
+        self.new_entries = {}
+        # A missing, truncated or outdated cache just means probing every image again
+        try:
+            with open(cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            self.entries = data["images"]
+
+    def resolve(self, url):
+        """
+        :return: The file behind a site-root URL such as /images/a.png, or None for
+            anything else (remote, protocol-relative and page-relative URLs).
+        """
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+        path = url.split("?", 1)[0].split("#", 1)[0]
+        return os.path.join(self.static_dir, *path.lstrip("/").split("/"))
+
+    def get_size(self, url):
+        """
+        :return: The image's (width, height), or None if it is not a local PNG, JPEG or GIF.
+        """
+        path = self.resolve(url)
+        if path is None:
+            return None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == mtime_ns:
+            size = entry[1]
+            return tuple(size) if size else None
+
+        try:
+            size = probe_dimensions(path)
+        except OSError:
+            size = None
+        logger.debug("Probed image %s: %s", path, size)
+        entry = [mtime_ns, list(size) if size else None]
+        self.entries[path] = entry
+        self.new_entries[path] = entry
+        return size
+
+    def save(self):
+        if not self.new_entries:
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": CACHE_VERSION, "images": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+        self.new_entries = {}
+
+
+# The probe used by the build, or None while it is off (the default)
+_sizes = None
+
+
+def enable(static_dir, cache_path):
+    """
+    Turns on image attributes for this process: see image_props().
+    :param static_dir: The directory that is copied to the site root.
+    :param cache_path: The JSON file holding probe results between builds.
+    """
+    global _sizes
+    _sizes = ImageSizes(static_dir, cache_path)
+
+
+def disable():
+    global _sizes
+    _sizes = None
+
+
+def get_settings():
+    """
+    :return: The (static_dir, cache_path) passed to enable(), or None while it is off.
+    """
+    if _sizes is None:
+        return None
+    return _sizes.static_dir, _sizes.cache_path
+
+
+def resolve(url):
+    """
+    :return: The static file behind an image URL (see ImageSizes.resolve), or None
+        while image attributes are off.
+    """
+    if _sizes is None:
+        return None
+    return _sizes.resolve(url)
+
+
+def image_props(url):
+    """
+    Extra <img> attributes for an image URL: its intrinsic width and height when it
+    can be probed, plus lazy loading and async decoding. Empty while disabled.
+    """
+    if _sizes is None:
+        return {}
+    props = {}
+    size = _sizes.get_size(url)
+    if size is not None:
+        props["width"] = str(size[0])
+        props["height"] = str(size[1])
+    props["loading"] = "lazy"
+    props["decoding"] = "async"
+    return props
+
+
+def take_new_entries():
+    """
+    Returns the probe results added since the last call, e.g. to ship them from a
+    worker process back to the parent, which owns the cache file.
+    """
+    if _sizes is None:
+        return {}
+    entries, _sizes.new_entries = _sizes.new_entries, {}
+    return entries
+
+
+def add_entries(entries):
+    """
+    Merges probe results made elsewhere, such as in a worker process.
+    """
+    if _sizes is not None and entries:
+        _sizes.entries.update(entries)
+        _sizes.new_entries.update(entries)
+
+
+def save():
+    if _sizes is not None:
+        _sizes.save()
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+
+class InlineCache:
+    """
+    A bounded LRU cache from inline markdown source text to its rendered HTML.
+    Size is measured in characters of key plus value, which tracks memory use
+    closely enough to cap it.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, text, render, size=len):
+        """
+        Returns the cached HTML for text, rendering and storing it on a miss.
+        :param text: The inline markdown source.
+        :param render: A function from the source text to its HTML string, or to
+            anything else derived from the text, such as (html, terms).
+        :param size: Measures what render returns, in characters.
+        """
+        entry = self.entries.get(text)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(text)
+            return entry[0]
+
+        self.misses += 1
+        html = render(text)
+        cost = len(text) + size(html)
+        if cost > self.max_chars:
+            # Larger than the whole cache: not worth evicting everything for
+            return html
+        self.entries[text] = (html, cost)
+        self.size += cost
+        while self.size > self.max_chars:
+            _, (_, old_cost) = self.entries.popitem(last=False)
+            self.size -= old_cost
+        return html
+
+
+# The cache used by the build, or None while caching is off (the default)
+_cache = None
+
+
+def enable(max_chars):
+    """
+    Turns on inline fragment caching for this process.
+    :param max_chars: The cache's capacity in characters of source plus HTML.
+    """
+    global _cache
+    _cache = InlineCache(max_chars)
+
+
+def disable():
+    global _cache
+    _cache = None
+
+
+def get_cache():
+    return _cache
+
+
+def take_stats():
+    """
+    Returns (hits, misses) since the last call and resets the counters, e.g. to
+    ship them from a worker process back to the parent.
+    """
+    if _cache is None:
+        return 0, 0
+    stats = (_cache.hits, _cache.misses)
+    _cache.hits = _cache.misses = 0
+    return stats
+
+
+def add_stats(hits, misses):
+    """
+    Adds counters collected elsewhere, such as in a worker process.
+    """
+    if _cache is not None:
+        _cache.hits += hits
+        _cache.misses += misses
+
+
+def stats():
+    """
+    :return: A dict with hits, misses, hit_rate, entries and size (in characters),
+        or None while caching is off.
+    """
+    if _cache is None:
+        return None
+    lookups = _cache.hits + _cache.misses
+    return {
+        "hits": _cache.hits,
+        "misses": _cache.misses,
+        "hit_rate": _cache.hits / lookups if lookups else 0.0,
+        "entries": len(_cache.entries),
+        "size": _cache.size,
+    }
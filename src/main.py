@@ -1,22 +1,363 @@
-import shutil
+import argparse
+import logging
 import os
-from copy_static_files import copy_static_files
+import time
+from copy_static_files import copy_static_files, sync_static_files
 from generate_pages_recursive  import generate_pages_recursive
+from generate_pages_parallel import discover_pages, generate_pages_parallel, PageBuildError
+from generate_pages_pipeline import generate_pages_pipelined
+from build_manifest import BuildManifest
+from deploy_manifest import remove_unexpected, write_deploy_manifest
+from page_index import PageIndex, check_site_links
+from search_index import SearchIndex
+import build_trace
+import discovery
+import doc_cache
+import image_probe
+import front_matter
+import inline_cache
+import minify
+import precompress
+import sharding
+import site_archive
+import template
 
-def main():
-    # Clean the public directory
-    public_dir = "public"
-    if os.path.exists(public_dir):
-        shutil.rmtree(public_dir)
+CACHE_DIR = ".cache"
+# Named templates, layouts and partials, kept out of static/ so they are never published
+TEMPLATE_DIR = "templates"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into public/.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages whose source or template changed since the last build",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes for page generation (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="with -j 1, read and write pages on I/O threads while the next page renders",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=8,
+        help="number of I/O threads for --pipeline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="K/N",
+        type=_shard_arg,
+        help="build only the pages of shard K of N (chosen by a stable hash of each path) "
+        "and list the outputs in public/" + sharding.SHARD_MANIFEST + "; shard 1 also builds "
+        "the static files and search index. Combine the shards with merge.sh",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="with --incremental, compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="with --incremental, hardlink static files into public/ where the filesystem allows",
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="count",
+        default=0,
+        help="log build progress (-v) or every file (-vv); the build is quiet by default",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="write a Chrome trace-event JSON file with a span for every build stage of every page",
+    )
+    parser.add_argument(
+        "--inline-cache",
+        metavar="MB",
+        type=float,
+        default=0,
+        help="cache rendered inline fragments, up to this many megabytes per process, "
+        "so repeated paragraphs and list items are parsed once",
+    )
+    parser.add_argument(
+        "--doc-cache",
+        metavar="MB",
+        type=float,
+        default=0,
+        help="keep the parsed node tree of every page on disk, up to this many megabytes, so "
+        "pages whose markdown is unchanged are not parsed again; each page is then read "
+        "whole instead of streamed (default: off)",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="delete the parsed-document cache and exit",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="write a .gz sibling next to every HTML, CSS, JS, SVG and JSON output that it makes smaller",
+    )
+    parser.add_argument(
+        "--gzip-level",
+        type=int,
+        default=9,
+        choices=range(1, 10),
+        metavar="1-9",
+        help="compression level for --gzip (default: 9)",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages whose front matter says draft: true",
+    )
+    parser.add_argument(
+        "--ignore",
+        metavar="GLOB",
+        action="append",
+        default=[],
+        help="skip content files and directories matching this glob: a name such as '*.draft.md', "
+        "or a path relative to content/ when it contains a / such as 'drafts/*'. "
+        "Hidden files are always skipped. May be given more than once",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip comments and redundant whitespace from the pages, the template and CSS files",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        help="write the site into a .tar, .tar.gz or .zip instead of public/; the same inputs "
+        "give a byte-identical archive (entry timestamps come from $SOURCE_DATE_EPOCH, or 0)",
+    )
+    parser.add_argument(
+        "--deploy-manifest",
+        metavar="PATH",
+        default=os.path.join(CACHE_DIR, "deploy-manifest.json"),
+        help="where to write the outputs added, changed and removed since the previous build, "
+        "with their hashes (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if args.archive:
+        try:
+            site_archive.archive_format(args.archive)
+        except ValueError as e:
+            parser.error(str(e))
+        # These all work on the files in public/, which an archive build leaves alone
+        for flag, value in (("--incremental", args.incremental), ("--gzip", args.gzip), ("--shard", args.shard)):
+            if value:
+                parser.error(f"--archive cannot be combined with {flag}")
+    return args
+
+
+def _shard_arg(text):
+    try:
+        return sharding.parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def configure_logging(verbosity):
+    """
+    Sends log records to stderr: warnings only by default, more with each -v.
+    """
+    level = logging.WARNING if verbosity <= 0 else logging.INFO if verbosity == 1 else logging.DEBUG
+    logging.basicConfig(level=level, format="%(message)s")
+
+
+def generate_pages(args, content_dir, template_path, public_dir, jobs, manifest=None):
+    if jobs == 1 and args.pipeline:
+        generate_pages_pipelined(content_dir, template_path, public_dir, manifest, args.io_threads)
+    elif jobs == 1:
+        generate_pages_recursive(content_dir, template_path, public_dir, manifest)
+    else:
+        generate_pages_parallel(content_dir, template_path, public_dir, jobs, manifest)
+
+
+def build_options(args):
+    # The options that change the HTML of every page, for the build manifest
+    return "minify" if args.minify else ""
 
-    # Copy static files
-    static_dir = "static"
-    copy_static_files(static_dir, public_dir)
 
-    # Generate pages recursively from the content directory
+def build_full(args, jobs, content_dir, static_dir, public_dir, template_path):
+    # Rebuild everything, but only rewrite outputs whose bytes changed so unchanged
+    # files keep their mtimes. Returns every path the build produces, so whatever
+    # else is left in public/ can be removed once compression has finished.
+    if sharding.is_primary():
+        copy_static_files(static_dir, public_dir, clean=False, record_path=os.path.join(CACHE_DIR, "static.json"))
+    if site_archive.get_archive() is not None:
+        # Nothing is written to public/, so the manifest describing it stays as it is
+        generate_pages(args, content_dir, template_path, public_dir, jobs)
+        return set()
+
+    # Record every page so a later incremental build does not trust stale entries
+    manifest = BuildManifest(
+        os.path.join(CACHE_DIR, "manifest.json"),
+        template_path,
+        fresh=True,
+        options=build_options(args),
+    )
+    try:
+        generate_pages(args, content_dir, template_path, public_dir, jobs, manifest)
+    finally:
+        manifest.save()
+
+    expected = {
+        dest_path
+        for src_path, dest_path in discover_pages(content_dir, public_dir)
+        if sharding.includes(src_path)
+    }
+    if sharding.is_primary():
+        for root, dirs, files in os.walk(static_dir):
+            rel_dir = os.path.relpath(root, static_dir)
+            for name in files:
+                if name != "template.html":
+                    expected.add(os.path.normpath(os.path.join(public_dir, rel_dir, name)))
+    if args.gzip:
+        expected |= {path + ".gz" for path in expected}
+    return expected
+
+
+def update_site_index(content_dir, static_dir, public_dir):
+    # Only pages whose sources changed are read again: their links are rechecked
+    # and their postings replaced in the search shards they touch
+    index = PageIndex(os.path.join(CACHE_DIR, "pages.json"))
+    index.update(discover_pages(content_dir, public_dir), public_dir)
+    check_site_links(index, static_dir)
+    # The saved state describes the search shards in public/, which an archive build
+    # does not touch. The archive's index is built from scratch instead, so its
+    # document ids do not depend on the history of earlier builds.
+    if site_archive.get_archive() is not None:
+        return SearchIndex(None).update(index, public_dir)
+    search = SearchIndex(os.path.join(CACHE_DIR, "search.json"))
+    outputs = search.update(index, public_dir)
+    search.save()
+    index.save()
+    return outputs
+
+
+def build_incremental(args, jobs, content_dir, static_dir, public_dir, template_path):
+    # Keep public/ and only touch what changed
+    if sharding.is_primary():
+        sync_static_files(
+            static_dir,
+            public_dir,
+            os.path.join(CACHE_DIR, "static.json"),
+            checksum=args.checksum,
+            hardlink=args.hardlink,
+        )
+    manifest = BuildManifest(os.path.join(CACHE_DIR, "manifest.json"), template_path, options=build_options(args))
+    try:
+        generate_pages(args, content_dir, template_path, public_dir, jobs, manifest)
+        manifest.remove_stale(public_dir)
+    finally:
+        # Pages that did build are recorded even if others failed
+        manifest.save()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(args.verbose)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    if args.clear_cache:
+        removed = doc_cache.clear(os.path.join(CACHE_DIR, "documents"))
+        logger.info("Removed %d cached document(s)", removed)
+        return
+    if args.trace:
+        build_trace.enable()
+    if args.inline_cache > 0:
+        # Text is counted in characters; about one byte each for typical content
+        inline_cache.enable(int(args.inline_cache * 1024 * 1024))
+    front_matter.set_include_drafts(args.drafts)
+    sharding.set_shard(args.shard)
+    # Directories whose mtime is unchanged since the last build are not listed again
+    discovery.configure(os.path.join(CACHE_DIR, "discovery.json"), discovery.DEFAULT_IGNORE + tuple(args.ignore))
+    if args.doc_cache > 0:
+        doc_cache.enable(os.path.join(CACHE_DIR, "documents"), int(args.doc_cache * 1024 * 1024))
+    if args.minify:
+        # Minified templates and stylesheets are cached by the hash of their source
+        minify.enable(os.path.join(CACHE_DIR, "minify"))
+    if args.gzip:
+        # Outputs are compressed on a thread pool as soon as they are written
+        precompress.enable(args.gzip_level, os.cpu_count() or 1)
+    started = time.perf_counter()
+
+    public_dir = "public"
+    static_dir = "static"
     content_dir = "content"
     template_path = os.path.join(static_dir, "template.html")
-    generate_pages_recursive(content_dir, template_path, public_dir)
+    template.set_template_dir(TEMPLATE_DIR)
+
+    # Give local images their intrinsic width and height
+    image_probe.enable(static_dir, os.path.join(CACHE_DIR, "images.json"))
+    if args.archive:
+        site_archive.open_archive(args.archive, public_dir)
+
+    built = False
+    try:
+        if args.incremental:
+            build_incremental(args, jobs, content_dir, static_dir, public_dir, template_path)
+        else:
+            expected = build_full(args, jobs, content_dir, static_dir, public_dir, template_path)
+        # The site-wide indexes cover every page, so only one shard builds them
+        search_outputs = update_site_index(content_dir, static_dir, public_dir) if sharding.is_primary() else []
+        built = True
+    except PageBuildError as e:
+        raise SystemExit(str(e))
+    finally:
+        # A failed build leaves no archive behind
+        site_archive.close_archive(built)
+        discovery.save()
+        image_probe.save()
+        cache = doc_cache.get_cache()
+        if cache is not None:
+            evicted = cache.evict()
+            logger.info(
+                "Document cache: %d hits, %d misses, %d evicted",
+                cache.hits,
+                cache.misses,
+                evicted,
+            )
+        compressed = precompress.finish()
+        if args.gzip:
+            logger.info("Pre-compressed %d file(s)", compressed)
+        if args.trace:
+            build_trace.save(args.trace)
+            logger.info("Trace written to %s", args.trace)
+    # An archive build leaves public/ alone, so there is nothing to prune or deploy from it
+    if not args.incremental and not args.archive:
+        expected.update(os.path.normpath(path) for path in search_outputs)
+        if args.gzip:
+            expected.update(os.path.normpath(path) + ".gz" for path in search_outputs)
+        if args.shard:
+            expected.add(os.path.normpath(os.path.join(public_dir, sharding.SHARD_MANIFEST)))
+        remove_unexpected(public_dir, expected)
+    if args.shard:
+        # Deploys go out from the merged site, so its merge writes the deploy manifest
+        sharding.write_shard_manifest(public_dir)
+    elif not args.archive:
+        write_deploy_manifest(public_dir, os.path.join(CACHE_DIR, "deploy.json"), args.deploy_manifest)
+    stats = inline_cache.stats()
+    if stats is not None:
+        logger.info(
+            "Inline cache: %d hits, %d misses (%.0f%% hit rate)",
+            stats["hits"],
+            stats["misses"],
+            stats["hit_rate"] * 100,
+        )
+    logger.info("Build finished in %.2f s", time.perf_counter() - started)
 
 if __name__ == "__main__":
     main()
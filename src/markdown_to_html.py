@@ -1,100 +1,116 @@
 from HTMLNode import *
 from textnode import *
-
-block_type_paragraph = "paragraph"
-block_type_heading = "heading"
-block_type_code = "code"
-block_type_quote = "quote"
-block_type_olist = "ordered_list"
-block_type_ulist = "unordered_list"
-
-def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
-            continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
-
-
-def block_to_block_type(block):
-    lines = block.split("\n")
-
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return block_type_heading
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return block_type_code
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return block_type_paragraph
-        return block_type_quote
-    if block.startswith("* "):
-        for line in lines:
-            if not line.startswith("* "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return block_type_paragraph
-            i += 1
-        return block_type_olist
-    return block_type_paragraph
+from block_lexer import *
+from front_matter import split_front_matter
+import build_trace
+import inline_cache
+from build_trace import span
+from search_index import count_terms
+
+def parse_markdown(source, terms=None):
+    """
+    Converts a markdown document into an HTMLNode tree and finds its title on the way.
+    :param source: A raw markdown string, or any iterable of lines such as an open file,
+        which is then read lazily one block at a time.
+    :param terms: Optional dict the searchable words of the document are counted
+        into (see search_index), from the TextNodes its text is parsed into.
+    :return: A tuple (html_node, title); title is None if there is no h1 line.
+    """
+    lines = source.split("\n") if isinstance(source, str) else source
+    blocks = iter_blocks(lines)
+    if build_trace.is_enabled():
+        # Traced builds lex up front so block and inline parsing get separate spans
+        with span("block parse"):
+            blocks = list(blocks)
+
+    title = None
+    children = []
+    with span("inline parse"):
+        for block_type, block_lines in blocks:
+            if title is None and block_type != block_type_code:
+                title = _find_title(block_lines)
+            children.append(lines_to_html_node(block_type, block_lines, terms))
+    return ParentNode("div", children, None), title
+
+def _find_title(lines):
+    for line in lines:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return None
 
 def markdown_to_html_node(markdown):
     """
     Converts a markdown document into a single HTMLNode with children representing each block.
-    :param markdown: A raw markdown string.
+    :param markdown: A raw markdown string, or an iterable of lines such as an open file.
     :return: An HTMLNode representing the document.
     """
-    blocks = markdown_to_blocks(markdown)  # Split the markdown into blocks
-    children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
-    return ParentNode("div", children, None)
+    return parse_markdown(markdown)[0]
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    lines = block.split("\n")
+    return lines_to_html_node(classify_lines(lines), lines)
+
+def lines_to_html_node(block_type, lines, terms=None):
+    # Code is not searchable, so its text is never counted into terms
     if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines, terms)
     if block_type == block_type_heading:
-        return heading_to_html_node(block)
+        return heading_to_html_node(lines, terms)
     if block_type == block_type_code:
-        return code_to_html_node(block)
+        return code_to_html_node(lines)
     if block_type == block_type_olist:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines, terms)
     if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines, terms)
     if block_type == block_type_quote:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines, terms)
     raise ValueError("Invalid block type")
 
-def text_to_children(text):
+def text_to_children(text, terms=None):
+    cache = inline_cache.get_cache()
+    if cache is not None:
+        # Repeated fragments are tokenized once; their HTML is reused as one raw leaf,
+        # and their terms are kept alongside it
+        html, fragment_terms = cache.get_or_render(text, _render_inline_terms, _inline_size)
+        if terms is not None:
+            for term, count in fragment_terms.items():
+                terms[term] = terms.get(term, 0) + count
+        return [LeafNode(None, html)]
+
     text_nodes = text_to_textnodes(text)
+    if terms is not None:
+        count_terms(text_nodes, terms)
     children = []
     for text_node in text_nodes:
         html_node = text_node_to_html_node(text_node)
         children.append(html_node)
     return children
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def render_inline(text):
+    """
+    Renders inline markdown (bold, italic, code, links, images) straight to HTML.
+    """
+    return "".join(text_node_to_html_node(text_node).to_html() for text_node in text_to_textnodes(text))
+
+def _render_inline_terms(text):
+    # What the inline cache keeps for a fragment: its HTML and its terms
+    text_nodes = text_to_textnodes(text)
+    terms = {}
+    count_terms(text_nodes, terms)
+    return "".join(text_node_to_html_node(text_node).to_html() for text_node in text_nodes), terms
+
+def _inline_size(entry):
+    html, terms = entry
+    return len(html) + sum(map(len, terms))
+
+def paragraph_to_html_node(lines, terms=None):
     paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+    children = text_to_children(paragraph, terms)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines, terms=None):
+    block = "\n".join(lines)
     level = 0
     for char in block:
         if char == "#":
@@ -104,55 +120,60 @@ def heading_to_html_node(block):
     if level + 1 >= len(block):
         raise ValueError(f"Invalid heading level: {level}")
     text = block[level + 1 :]
-    children = text_to_children(text)
+    children = text_to_children(text, terms)
     return ParentNode(f"h{level}", children)
 
-def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(lines):
+    if classify_lines(lines) != block_type_code:
         raise ValueError("Invalid code block")
-    text = block[4:-3]
+    if len(lines) == 1:
+        # ```code``` on a single line
+        text = lines[0][3:-3]
+    else:
+        # Everything between the fence lines, blank lines included
+        text = "".join(line + "\n" for line in lines[1:-1])
     children = text_to_children(text)
     code = ParentNode("code", children)
     return ParentNode("pre", [code])
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(lines, terms=None):
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[3:]
-        children = text_to_children(text)
+        children = text_to_children(text, terms)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(lines, terms=None):
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[2:]
-        children = text_to_children(text)
+        children = text_to_children(text, terms)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines, terms=None):
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
             raise ValueError("Invalid quote block")
         new_lines.append(line.lstrip(">").strip())
     content = " ".join(new_lines)
-    children = text_to_children(content)
+    children = text_to_children(content, terms)
     return ParentNode("blockquote", children)
 
 def extract_title(markdown):
     """
-    Extracts the first h1 header from the markdown content.
+    Extracts the page title: the front matter's title, or else the first h1 header.
     :param markdown: The markdown string.
     :return: The title string (without the #).
     :raises: Exception if no h1 header is found.
     """
-    for line in markdown.splitlines():
+    front_matter, lines = split_front_matter(markdown.splitlines())
+    if front_matter.get("title") is not None:
+        return str(front_matter["title"])
+    for line in lines:
         if line.startswith("# "):  # Look for a line that starts with "# "
             return line[2:].strip()  # Remove the "# " and strip whitespace
 
@@ -0,0 +1,34 @@
+import argparse
+import logging
+import os
+from deploy_manifest import write_deploy_manifest
+from sharding import ShardMergeError, merge_shards
+import main as build
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the outputs of a sharded build (--shard K/N) into one site.")
+    parser.add_argument("shard_dirs", nargs="+", metavar="SHARD_DIR", help="the public/ directory of each shard")
+    parser.add_argument("-o", "--output", default="public", help="the merged site (default: %(default)s)")
+    parser.add_argument(
+        "--deploy-manifest",
+        metavar="PATH",
+        default=os.path.join(build.CACHE_DIR, "deploy-manifest.json"),
+        help="where to write the outputs added, changed and removed since the previous merge "
+        "(default: %(default)s)",
+    )
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="log progress (-v) or every file (-vv)")
+    args = parser.parse_args(argv)
+    build.configure_logging(args.verbose)
+
+    try:
+        merged = merge_shards(args.shard_dirs, args.output)
+    except ShardMergeError as e:
+        raise SystemExit(str(e))
+    logger.info("Merged %d shard(s) into %s: %d file(s)", len(args.shard_dirs), args.output, merged)
+    write_deploy_manifest(args.output, os.path.join(build.CACHE_DIR, "deploy.json"), args.deploy_manifest)
+
+if __name__ == "__main__":
+    main()
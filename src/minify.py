@@ -0,0 +1,176 @@
+import hashlib
+import os
+import re
+import threading
+from HTMLNode import LeafNode, ParentNode
+
+# Elements whose content must be kept byte for byte
+PRESERVE_PATTERN = re.compile(r"(<(pre|code|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE)
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+TAG_PATTERN = re.compile(r"(<[^>]+>)")
+TAG_NAME_PATTERN = re.compile(r"^</?([a-zA-Z0-9!]+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Whitespace next to these tags is never rendered, so it can go entirely
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "meta", "link", "title", "base",
+    "article", "section", "div", "p", "h1", "h2", "h3", "h4", "h5", "h6",
+    "ul", "ol", "li", "blockquote", "pre", "header", "footer", "nav", "main",
+    "aside", "table", "thead", "tbody", "tfoot", "tr", "td", "th", "hr", "br",
+    "form", "figure", "figcaption", "script", "style", "noscript",
+))
+
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_STRING_PATTERN = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+CSS_COLON_PATTERN = re.compile(r":\s+")
+
+# Bump when the minifiers change, so cached results made by older code are not reused
+MINIFY_VERSION = 1
+
+
+def _is_block_tag(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    return match is not None and match.group(1).lower() in BLOCK_TAGS
+
+
+def _minify_markup(html):
+    # Minifies HTML that contains no preserved elements
+    parts = TAG_PATTERN.split(COMMENT_PATTERN.sub("", html))
+    # parts alternates text, tag, text, ...: trim text where a neighbouring tag is a block
+    for i in range(0, len(parts), 2):
+        text = WHITESPACE_PATTERN.sub(" ", parts[i])
+        if i > 0 and _is_block_tag(parts[i - 1]):
+            text = text.lstrip()
+        if i + 1 < len(parts) and _is_block_tag(parts[i + 1]):
+            text = text.rstrip()
+        parts[i] = text
+    return "".join(parts)
+
+
+def minify_html(html):
+    """
+    Removes comments and redundant whitespace from an HTML document, such as the
+    page template. Runs of whitespace become one space, and whitespace next to
+    block-level tags is dropped. pre, code, textarea, script and style elements
+    are kept as they are.
+    :param html: The HTML source.
+    :return: The minified HTML.
+    """
+    pieces = PRESERVE_PATTERN.split(html)
+    # split() yields text, preserved element, its tag name, text, ...
+    out = []
+    for i in range(0, len(pieces), 3):
+        out.append(_minify_markup(pieces[i]))
+        if i + 1 < len(pieces):
+            out.append(pieces[i + 1])
+    return "".join(out)
+
+
+def collapse_whitespace(html):
+    """
+    Collapses runs of whitespace to one space outside of pre, code, textarea,
+    script and style elements. Unlike minify_html() it never removes whitespace
+    outright, so it is safe on fragments whose surrounding tags are unknown.
+    """
+    pieces = PRESERVE_PATTERN.split(html)
+    out = []
+    for i in range(0, len(pieces), 3):
+        out.append(WHITESPACE_PATTERN.sub(" ", pieces[i]))
+        if i + 1 < len(pieces):
+            out.append(pieces[i + 1])
+    return "".join(out)
+
+
+def minify_tree(node):
+    """
+    Collapses the whitespace in the text of a rendered node tree, in place.
+    pre and code elements (and everything inside them) are left untouched.
+    The tree is walked with an explicit stack, like HTMLNode.iter_html().
+    :param node: The root HTMLNode.
+    :return: The same node.
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag in PRESERVE_TAGS:
+            continue
+        if isinstance(current, ParentNode):
+            stack.extend(current.children)
+        elif isinstance(current, LeafNode) and current.value:
+            # Untagged leaves may hold pre-rendered HTML (see inline_cache)
+            current.value = collapse_whitespace(current.value)
+    return node
+
+
+def minify_css(css):
+    """
+    Removes comments and redundant whitespace from a stylesheet. String literals
+    are kept as they are.
+    :param css: The CSS source.
+    :return: The minified CSS.
+    """
+    pieces = CSS_STRING_PATTERN.split(CSS_COMMENT_PATTERN.sub("", css))
+    # Odd pieces are string literals
+    for i in range(0, len(pieces), 2):
+        text = WHITESPACE_PATTERN.sub(" ", pieces[i])
+        text = CSS_PUNCTUATION_PATTERN.sub(r"\1", text)
+        # Only after the colon: "a :hover" and "a:hover" are different selectors
+        pieces[i] = CSS_COLON_PATTERN.sub(":", text)
+    return "".join(pieces).replace(";}", "}").strip()
+
+
+# The directory minified results are cached in, or None while minification is off
+_cache_dir = None
+
+
+def enable(cache_dir):
+    """
+    Turns on minification for this process.
+    :param cache_dir: The directory minified templates and stylesheets are cached in,
+        by the hash of their source.
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def disable():
+    global _cache_dir
+    _cache_dir = None
+
+
+def is_enabled():
+    return _cache_dir is not None
+
+
+def get_settings():
+    """
+    :return: The cache directory passed to enable(), or None while minification is off.
+    """
+    return _cache_dir
+
+
+def cached(kind, source, minifier):
+    """
+    Minifies source, reusing the result of an earlier build for the same content.
+    :param kind: The file type, used as the cache file extension (e.g. 'css').
+    :param source: The text to minify.
+    :param minifier: A function from source to its minified form.
+    """
+    digest = hashlib.sha256(f"{MINIFY_VERSION}:{source}".encode()).hexdigest()
+    path = os.path.join(_cache_dir, f"{digest}.{kind}")
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    result = minifier(source)
+    os.makedirs(_cache_dir, exist_ok=True)
+    # Unique per thread, since parallel workers may minify the same content
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(result)
+    os.replace(tmp_path, path)
+    return result
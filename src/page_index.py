@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import posixpath
+import re
+from block_lexer import iter_blocks, block_type_code
+from front_matter import page_metadata, split_front_matter
+from textnode import extract_markdown_images, extract_markdown_links
+
+INDEX_VERSION = 2
+
+# Links with a scheme (https:, mailto:, ...) or a protocol-relative host point off-site
+EXTERNAL_URL_PATTERN = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+
+logger = logging.getLogger(__name__)
+
+
+def scan_page(src_path):
+    """
+    Reads a page's metadata, outgoing links and images from its markdown.
+    Fenced code blocks are skipped, since their brackets are not links.
+    :param src_path: The path to the markdown file.
+    :return: A dict with "title" (or None), "date" (or None), "tags", "links" and
+        "images" (lists of URLs).
+    """
+    text_blocks = []
+    with open(src_path, 'r') as f:
+        front_matter, lines = split_front_matter(f)
+        for block_type, block_lines in iter_blocks(lines):
+            if block_type != block_type_code:
+                text_blocks.append("\n".join(block_lines))
+    text = "\n\n".join(text_blocks)
+
+    body_title = None
+    for line in text.splitlines():
+        if line.startswith("# "):
+            body_title = line[2:].strip()
+            break
+    metadata = page_metadata(front_matter, body_title)
+    return {
+        "title": metadata["title"],
+        "date": metadata["date"],
+        "tags": metadata["tags"],
+        "links": [url for _, url in extract_markdown_links(text)],
+        "images": [url for _, url in extract_markdown_images(text)],
+    }
+
+
+def page_urls(rel_path):
+    """
+    The site URLs that reach an output page, e.g. blog/index.html is served at
+    /blog/index.html, /blog/ and /blog.
+    :param rel_path: The page's path relative to the output directory, with / separators.
+    """
+    urls = ["/" + rel_path]
+    if rel_path.endswith(".html"):
+        stem = rel_path[:-len(".html")]
+        if stem == "index":
+            urls.append("/")
+        elif stem.endswith("/index"):
+            directory = "/" + stem[:-len("/index")]
+            urls += [directory + "/", directory]
+        else:
+            urls.append("/" + stem)
+    return urls
+
+
+def resolve_url(url, page_url):
+    """
+    Turns a link found on a page into the site-root path it points to.
+    :param url: The link target as written in the markdown.
+    :param page_url: The canonical URL of the page containing the link.
+    :return: A normalized path such as /images/a.png, or None for external
+        and same-page (#fragment) links.
+    """
+    if EXTERNAL_URL_PATTERN.match(url):
+        return None
+    path = url.split("#", 1)[0].split("?", 1)[0]
+    if not path:
+        return None
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page_url), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+class PageIndex:
+    """
+    Persisted index of every page's title, outgoing links and images, used to check
+    internal links without crawling the output.
+    Pages are rescanned only when their source's size or mtime changes, and only
+    pages whose links or link targets changed since the last check are rechecked.
+    :param index_path: The JSON file the index is kept in between builds.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.pages = {}
+        self.targets = []
+        # Sources whose links changed or that are new, so they must be rechecked
+        self.dirty = set()
+        # Sources read again during the last update(), e.g. for the search index
+        self.rescanned = set()
+        try:
+            with open(index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == INDEX_VERSION:
+            self.pages = data["pages"]
+            self.targets = data["targets"]
+
+    def update(self, pages, public_dir):
+        """
+        Brings the index in line with the pages of this build.
+        :param pages: A list of (src_path, dest_path) tuples, as from discover_pages().
+        :param public_dir: The output directory the dest paths are under.
+        """
+        current = {}
+        self.rescanned = set()
+        for src_path, dest_path in pages:
+            st = os.stat(src_path)
+            rel_path = os.path.relpath(dest_path, public_dir).replace(os.sep, "/")
+            entry = self.pages.get(src_path)
+            if (
+                entry is not None
+                and entry["mtime"] == st.st_mtime_ns
+                and entry["size"] == st.st_size
+                and entry["url"] == "/" + rel_path
+            ):
+                current[src_path] = entry
+                continue
+
+            info = scan_page(src_path)
+            self.rescanned.add(src_path)
+            new_entry = {
+                "url": "/" + rel_path,
+                "mtime": st.st_mtime_ns,
+                "size": st.st_size,
+                "title": info["title"],
+                "date": info["date"],
+                "tags": info["tags"],
+                "links": info["links"],
+                "images": info["images"],
+                "broken": entry["broken"] if entry is not None else [],
+            }
+            if entry is None or any(entry[key] != new_entry[key] for key in ("url", "links", "images")):
+                self.dirty.add(src_path)
+            current[src_path] = new_entry
+        self.pages = current
+
+    def check_links(self, static_files):
+        """
+        Validates every internal link and image reference against the pages in the
+        index and the static files. Only pages whose own links changed, or that
+        point at a target that appeared or disappeared, are rechecked; the others
+        keep their previous result.
+        :param static_files: The site-root paths of the static files, e.g. /index.css.
+        :return: A sorted list of (src_path, url) tuples for the dangling references.
+        """
+        targets = set(static_files)
+        for entry in self.pages.values():
+            targets.update(page_urls(entry["url"][1:]))
+
+        changed_targets = targets.symmetric_difference(self.targets)
+        recheck = set(self.dirty)
+        if changed_targets:
+            # One pass over all links to find the pages that refer to a changed target
+            for src_path, entry in self.pages.items():
+                for url in entry["links"] + entry["images"]:
+                    if resolve_url(url, entry["url"]) in changed_targets:
+                        recheck.add(src_path)
+                        break
+
+        for src_path in recheck:
+            entry = self.pages[src_path]
+            broken = []
+            for url in entry["links"] + entry["images"]:
+                resolved = resolve_url(url, entry["url"])
+                if resolved is not None and resolved not in targets:
+                    broken.append(url)
+            entry["broken"] = broken
+        logger.debug("Rechecked links on %d of %d page(s)", len(recheck), len(self.pages))
+
+        self.targets = sorted(targets)
+        self.dirty = set()
+        return sorted(
+            (src_path, url)
+            for src_path, entry in self.pages.items()
+            for url in entry["broken"]
+        )
+
+    def save(self):
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": INDEX_VERSION, "pages": self.pages, "targets": self.targets}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+
+def static_urls(static_dir):
+    """
+    The site-root paths of the files copied from the static directory.
+    """
+    urls = []
+    for root, dirs, files in os.walk(static_dir):
+        rel_dir = os.path.relpath(root, static_dir)
+        for name in files:
+            if name != "template.html":
+                rel_path = os.path.normpath(os.path.join(rel_dir, name)).replace(os.sep, "/")
+                urls.append("/" + rel_path)
+    return urls
+
+
+def check_site_links(index, static_dir):
+    """
+    Reports the dangling internal links and images of an updated page index as warnings.
+    :param index: A PageIndex that has been updated for this build.
+    :param static_dir: The directory that is copied to the site root.
+    :return: A sorted list of (src_path, url) tuples for the dangling references.
+    """
+    broken = index.check_links(static_urls(static_dir))
+    for src_path, url in broken:
+        logger.warning("Broken link in %s: %s", src_path, url)
+    return broken
@@ -0,0 +1,146 @@
+import gzip
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from build_trace import span
+
+# Text assets worth serving pre-compressed (e.g. with nginx gzip_static)
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json")
+
+logger = logging.getLogger(__name__)
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress_file(path, level):
+    """
+    Writes a .gz sibling for a file, or removes an outdated one when compression
+    would not make the file smaller.
+    :param path: The file to compress.
+    :param level: The gzip compression level (1-9).
+    :return: True if a .gz was written; False if the existing one was already up to
+        date or the file is not worth compressing.
+    """
+    gz_path = path + ".gz"
+    with span("gzip", path=path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        # A fixed header mtime keeps identical inputs byte-identical
+        compressed = gzip.compress(data, compresslevel=level, mtime=0)
+        if len(compressed) >= len(data):
+            if os.path.exists(gz_path):
+                os.remove(gz_path)
+            return False
+
+        # Leave an identical .gz alone so its mtime stays the same, unless it is
+        # older than the file and would look outdated to submit_if_outdated
+        try:
+            with open(gz_path, 'rb') as f:
+                if f.read() == compressed:
+                    if os.stat(gz_path).st_mtime_ns < os.stat(path).st_mtime_ns:
+                        os.utime(gz_path)
+                    return False
+        except FileNotFoundError:
+            pass
+
+        tmp_path = gz_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, gz_path)
+    logger.debug("Compressed %s (%d -> %d bytes)", path, len(data), len(compressed))
+    return True
+
+
+def remove_compressed(path):
+    """
+    Deletes the .gz sibling of an output that was removed, if there is one.
+    """
+    gz_path = path + ".gz"
+    if os.path.exists(gz_path):
+        os.remove(gz_path)
+
+
+class Compressor:
+    """
+    Compresses outputs on a thread pool while the build keeps writing more.
+    zlib releases the GIL, so the threads compress in parallel with rendering.
+    """
+
+    def __init__(self, level, jobs):
+        self.level = level
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        self.futures = []
+
+    def submit(self, path):
+        if is_compressible(path):
+            self.futures.append(self.executor.submit(compress_file, path, self.level))
+
+    def finish(self):
+        """
+        Waits for all pending compressions and re-raises the first error.
+        :return: The number of .gz files written; unchanged ones are not counted.
+        """
+        self.executor.shutdown(wait=True)
+        written = sum(1 for future in self.futures if future.result())
+        self.futures = []
+        return written
+
+
+# The compressor used by the build, or None while pre-compression is off (the default)
+_compressor = None
+
+
+def enable(level, jobs):
+    """
+    Turns on pre-compression: every output passed to submit() gets a .gz sibling.
+    :param level: The gzip compression level (1-9).
+    :param jobs: The number of compression threads.
+    """
+    global _compressor
+    _compressor = Compressor(level, jobs)
+
+
+def is_enabled():
+    return _compressor is not None
+
+
+def submit(path):
+    """
+    Queues a freshly written output for compression. While pre-compression is off,
+    drops any .gz left by an earlier build instead, so it never serves stale content.
+    """
+    if _compressor is not None:
+        _compressor.submit(path)
+    elif is_compressible(path):
+        remove_compressed(path)
+
+
+def submit_if_outdated(path):
+    """
+    Queues an output the build left as it was (e.g. current in an incremental build)
+    when its .gz is missing or older than it, as after a build without pre-compression
+    or an edit through a hardlink. While pre-compression is off, an outdated .gz is
+    dropped instead.
+    """
+    if not is_compressible(path):
+        return
+    try:
+        outdated = os.stat(path + ".gz").st_mtime_ns < os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        outdated = _compressor is not None
+    if outdated:
+        submit(path)
+
+
+def finish():
+    """
+    Waits for queued compressions and turns pre-compression off again.
+    :return: The number of .gz files written.
+    """
+    global _compressor
+    if _compressor is None:
+        return 0
+    compressor, _compressor = _compressor, None
+    return compressor.finish()
@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import re
+from block_lexer import *
+from deploy_manifest import replace_if_changed
+from front_matter import split_front_matter
+import precompress
+import site_archive
+from textnode import text_to_textnodes
+
+SEARCH_VERSION = 1
+# Terms are grouped into shards by their first PREFIX_LENGTH characters
+PREFIX_LENGTH = 2
+SEARCH_DIR = "search"
+
+TERM_PATTERN = re.compile(r"\w{2,}")
+SAFE_SHARD_NAME = re.compile(r"^[a-z0-9_]+$")
+ORDERED_LIST_MARKER = re.compile(r"^\d+\. ")
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_marker(block_type, line):
+    # Drop the block syntax so only the words are indexed
+    if block_type == block_type_heading:
+        return line.lstrip("#").lstrip()
+    if block_type == block_type_quote:
+        return line.lstrip(">").strip()
+    if block_type == block_type_ulist:
+        return line[2:]
+    if block_type == block_type_olist:
+        return ORDERED_LIST_MARKER.sub("", line)
+    return line
+
+
+def count_terms(text_nodes, terms):
+    """
+    Counts the searchable words of TextNodes, including link text and image alt text.
+    :param text_nodes: An iterable of TextNode objects.
+    :param terms: A dict from lowercase term to its number of occurrences, updated in place.
+    """
+    for node in text_nodes:
+        for term in TERM_PATTERN.findall(node.text.lower()):
+            terms[term] = terms.get(term, 0) + 1
+
+
+def page_terms(src_path):
+    """
+    Counts the searchable words of a page: the text of its TextNodes outside of
+    fenced code. Front matter is not indexed. Only needed for pages the build did
+    not render; rendering counts the terms of a page as it parses it.
+    :param src_path: The path to the markdown file.
+    :return: A dict from lowercase term to its number of occurrences.
+    """
+    terms = {}
+    with open(src_path, 'r') as f:
+        _, body = split_front_matter(f)
+        for block_type, lines in iter_blocks(body):
+            if block_type == block_type_code:
+                continue
+            text = "\n".join(_strip_marker(block_type, line) for line in lines)
+            count_terms(text_to_textnodes(text), terms)
+    return terms
+
+
+# Terms counted while this process rendered pages, by source path, until update()
+_rendered_terms = {}
+
+
+def record_terms(src_path, terms):
+    """
+    Hands over the terms counted while a page was rendered, so the search index
+    does not read and parse the page a second time.
+    """
+    _rendered_terms[src_path] = terms
+
+
+def shard_name(prefix):
+    """
+    The file name of a shard, readable for plain ASCII prefixes and hex-encoded otherwise.
+    """
+    if SAFE_SHARD_NAME.match(prefix):
+        return prefix + ".json"
+    return "x" + prefix.encode("utf-8").hex() + ".json"
+
+
+def _write_json(path, content):
+    # Compact JSON, written only when it differs so unchanged shards keep their mtime
+    archive = site_archive.get_archive()
+    if archive is not None:
+        archive.write_text(path, json.dumps(content, separators=(",", ":"), sort_keys=True, ensure_ascii=False))
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(content, f, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return replace_if_changed(tmp_path, path)
+
+
+def _doc_url(page_url):
+    # Link to /blog/ rather than /blog/index.html
+    if page_url.endswith("/index.html"):
+        return page_url[:-len("index.html")]
+    return page_url
+
+
+class SearchIndex:
+    """
+    Inverted index of the site's pages, published as prefix shards under public/search/.
+    search/meta.json lists the documents as [url, title] (a document id is its
+    position) and maps each prefix to its shard file; a shard maps every term with
+    that prefix to a list of [document id, occurrences]. A browser loads meta.json
+    and then only the shard for the prefix being typed.
+    The postings are kept in a state file between builds, so only the shards
+    holding terms of changed or removed pages are rewritten.
+    :param state_path: The JSON file the postings are kept in between builds, or
+        None to index every page from scratch, with document ids in page order.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.docs = []
+        self.pages = {}
+        self.shards = {}
+        if state_path is None:
+            return
+        try:
+            with open(state_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == SEARCH_VERSION:
+            self.docs = data["docs"]
+            self.pages = data["pages"]
+            self.shards = data["shards"]
+
+    def _set_terms(self, doc_id, old_terms, new_terms, touched):
+        # Only terms whose count changed touch their shard
+        key = str(doc_id)
+        for term in old_terms.keys() | new_terms.keys():
+            count = new_terms.get(term)
+            if old_terms.get(term) == count:
+                continue
+            prefix = term[:PREFIX_LENGTH]
+            postings = self.shards.setdefault(prefix, {}).setdefault(term, {})
+            if count is None:
+                del postings[key]
+                if not postings:
+                    del self.shards[prefix][term]
+            else:
+                postings[key] = count
+            touched.add(prefix)
+
+    def update(self, page_index, public_dir):
+        """
+        Reindexes the pages the page index rescanned (or that are missing here),
+        drops removed pages, and writes the affected shards and meta.json.
+        :param page_index: A PageIndex that has been updated for this build.
+        :param public_dir: The output directory; shards go to public_dir/search/.
+        :return: The paths of every file that makes up the published index.
+        """
+        touched = set()
+        free_ids = []
+        for src_path in sorted(set(self.pages) - set(page_index.pages)):
+            page = self.pages.pop(src_path)
+            self._set_terms(page["id"], page["terms"], {}, touched)
+            self.docs[page["id"]] = None
+            free_ids.append(page["id"])
+
+        for src_path in sorted(page_index.pages):
+            page = self.pages.get(src_path)
+            if page is not None and src_path not in page_index.rescanned:
+                continue
+            terms = _rendered_terms.pop(src_path, None)
+            if terms is None:
+                # Not rendered by this build, e.g. skipped as unchanged or left to another shard
+                terms = page_terms(src_path)
+            if page is None:
+                if free_ids:
+                    doc_id = free_ids.pop()
+                else:
+                    self.docs.append(None)
+                    doc_id = len(self.docs) - 1
+                page = self.pages[src_path] = {"id": doc_id, "terms": {}}
+            self._set_terms(page["id"], page["terms"], terms, touched)
+            page["terms"] = terms
+
+        for src_path, entry in page_index.pages.items():
+            self.docs[self.pages[src_path]["id"]] = [_doc_url(entry["url"]), entry["title"]]
+        while self.docs and self.docs[-1] is None:
+            self.docs.pop()
+
+        search_dir = os.path.join(public_dir, SEARCH_DIR)
+        outputs = [os.path.join(search_dir, "meta.json")]
+        written = set()
+        # An archive build needs every shard and must leave the output directory alone
+        in_archive = site_archive.get_archive() is not None
+        for prefix in sorted(self.shards):
+            path = os.path.join(search_dir, shard_name(prefix))
+            terms = self.shards[prefix]
+            if not terms:
+                del self.shards[prefix]
+                if not in_archive and os.path.exists(path):
+                    os.remove(path)
+                continue
+            outputs.append(path)
+            # A shard whose file went missing (e.g. removed by hand) is rewritten too
+            if prefix in touched or in_archive or not os.path.exists(path):
+                postings = {
+                    term: sorted([int(doc_id), count] for doc_id, count in docs.items())
+                    for term, docs in terms.items()
+                }
+                if _write_json(path, postings):
+                    written.add(path)
+
+        meta = {
+            "version": SEARCH_VERSION,
+            "prefix_length": PREFIX_LENGTH,
+            "docs": self.docs,
+            "shards": {prefix: shard_name(prefix) for prefix in self.shards},
+        }
+        rewritten = len(written)
+        if _write_json(outputs[0], meta):
+            written.add(outputs[0])
+        # An unchanged file keeps the .gz an earlier build made for it
+        for path in outputs:
+            if path in written:
+                precompress.submit(path)
+            else:
+                precompress.submit_if_outdated(path)
+        _rendered_terms.clear()
+        logger.info("Search index: %d page(s), %d shard(s) rewritten", len(self.pages), rewritten)
+        return outputs
+
+    def save(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(
+                {"version": SEARCH_VERSION, "docs": self.docs, "pages": self.pages, "shards": self.shards},
+                f,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,304 @@
+import argparse
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from copy_static_files import copy_file
+from generate_page import generate_page
+from generate_pages_parallel import discover_pages
+from build_manifest import prune_empty_dirs
+from front_matter import is_skipped_draft, scan_metadata
+from template import get_template_dir, template_files, template_path_for
+from textnode import extract_markdown_images
+import discovery
+import image_probe
+import main as build
+
+logger = logging.getLogger(__name__)
+
+RELOAD_PATH = "/__reload"
+# The image formats whose size ends up in the pages that show them (see image_probe)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+# Polls wait at least this many times as long as the last scan took, so watching a
+# large tree (about 200 ms a scan for 40k files) keeps to a fifth of a core
+POLL_BACKOFF = 4
+
+# Injected into every served HTML page: reloads the page when the server says so
+RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + RELOAD_PATH + "\")"
+    ".onmessage = function () { location.reload(); };</script>"
+)
+
+
+class ReloadNotifier:
+    """
+    Tracks a build version that browsers wait on through server-sent events.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, seen_version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    notifier = None
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self._stream_reloads()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self._send_html(path)
+            return
+        super().do_GET()
+
+    def _send_html(self, path):
+        with open(path, 'rb') as f:
+            body = f.read()
+        script = RELOAD_SCRIPT.encode()
+        idx = body.rfind(b"</body>")
+        body = body[:idx] + script + body[idx:] if idx >= 0 else body + script
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seen = self.notifier.version
+        try:
+            while True:
+                version = self.notifier.wait(seen, timeout=15)
+                # A comment line on timeout keeps idle connections open
+                self.wfile.write(b"data: reload\n\n" if version != seen else b": ping\n\n")
+                self.wfile.flush()
+                seen = version
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        # Keep the console for build output
+        pass
+
+
+def snapshot(directory, skip_dir=None):
+    """
+    Records the mtime and size of every file under a directory.
+    :param directory: The directory to scan.
+    :param skip_dir: Optional predicate on a subdirectory's path; the directories it
+        accepts are not scanned.
+    :return: A dict mapping file paths to (mtime_ns, size).
+    """
+    files = {}
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if skip_dir is None or not skip_dir(entry.path):
+                        stack.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    """
+    :return: A tuple (changed, removed) of sorted path lists; added files count as changed.
+    """
+    changed = sorted(path for path, key in new.items() if old.get(path) != key)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+def _is_template(path, template_path):
+    template_dir = get_template_dir()
+    return path == template_path or (template_dir is not None and path.startswith(template_dir + os.sep))
+
+
+def _is_page(path, content_dir):
+    # The markdown files a build picks up, which leaves out ignored files such as an
+    # editor's .#page.md
+    rel_path = os.path.relpath(path, content_dir).replace(os.sep, "/")
+    return path.endswith(".md") and not discovery.ignores(rel_path)
+
+
+def _uses_changed_inputs(src_path, template_path, changed_templates, changed_images):
+    # Whether a page renders with a changed template, layout or partial, or shows a
+    # changed image, whose size is part of its HTML
+    if changed_templates:
+        page_template = template_path_for(template_path, scan_metadata(src_path)["template"])
+        if changed_templates.intersection(template_files(page_template)):
+            return True
+    if changed_images:
+        with open(src_path, 'r') as f:
+            text = f.read()
+        return any(image_probe.resolve(url) in changed_images for _, url in extract_markdown_images(text))
+    return False
+
+
+def rebuild(changed, removed, content_dir, static_dir, public_dir, template_path):
+    """
+    Applies a batch of file changes to public/ with the smallest rebuild possible:
+    one page per changed markdown file, one copy per changed static file, and every
+    page whose template, or one of its layouts or partials, changed or that shows a
+    changed image. Ignored files and skipped drafts are left out as in a full build;
+    a page that became a draft is removed.
+    """
+    changed_templates = {path for path in changed + removed if _is_template(path, template_path)}
+    changed_images = {
+        path for path in changed + removed
+        if path.startswith(static_dir + os.sep) and path.lower().endswith(IMAGE_EXTENSIONS)
+    }
+    if changed_templates or changed_images:
+        rebuilt = set()
+        for src_path, dest_path in discover_pages(content_dir, public_dir):
+            if src_path in changed or _uses_changed_inputs(src_path, template_path, changed_templates, changed_images):
+                generate_page(src_path, template_path, dest_path)
+                rebuilt.add(src_path)
+        logger.info("Templates or images changed, rebuilt %d page(s)", len(rebuilt))
+        changed = [path for path in changed if path not in rebuilt and not _is_template(path, template_path)]
+        removed = [path for path in removed if not _is_template(path, template_path)]
+
+    for path in changed:
+        if path.startswith(content_dir + os.sep):
+            if not _is_page(path, content_dir):
+                continue
+            dest_path = _page_output(path, content_dir, public_dir)
+            if is_skipped_draft(path):
+                _remove_output(dest_path, public_dir)
+            else:
+                generate_page(path, template_path, dest_path)
+        elif path != template_path:
+            dest_path = os.path.join(public_dir, os.path.relpath(path, static_dir))
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_file(path, dest_path)
+            logger.debug("File copied: %s", dest_path)
+
+    for path in removed:
+        if path.startswith(content_dir + os.sep):
+            if _is_page(path, content_dir):
+                _remove_output(_page_output(path, content_dir, public_dir), public_dir)
+        elif path != template_path:
+            _remove_output(os.path.join(public_dir, os.path.relpath(path, static_dir)), public_dir)
+
+
+def _remove_output(dest_path, public_dir):
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+        logger.info("Removed: %s", dest_path)
+    prune_empty_dirs(dest_path, public_dir)
+
+
+def _page_output(src_path, content_dir, public_dir):
+    rel_path = os.path.relpath(src_path, content_dir)
+    return os.path.join(public_dir, rel_path[:-3] + ".html")
+
+
+def _snapshot_sources(content_dir, static_dir):
+    # Ignored content directories (such as .git) never hold pages, so are not scanned
+    def is_ignored_dir(path):
+        return discovery.ignores(os.path.relpath(path, content_dir).replace(os.sep, "/"))
+
+    files = {**snapshot(content_dir, is_ignored_dir), **snapshot(static_dir)}
+    template_dir = get_template_dir()
+    if template_dir is not None and os.path.isdir(template_dir):
+        files.update(snapshot(template_dir))
+    return files
+
+
+def watch(notifier, content_dir, static_dir, public_dir, template_path, interval):
+    """
+    Polls content/, static/ and templates/ forever, rebuilding and notifying browsers on change.
+    Every poll stats each file, so on large trees the wait between polls grows with
+    the time a scan takes (see POLL_BACKOFF).
+    """
+    state = _snapshot_sources(content_dir, static_dir)
+    scan_time = 0
+    while True:
+        time.sleep(max(interval, scan_time * POLL_BACKOFF))
+        started = time.perf_counter()
+        current = _snapshot_sources(content_dir, static_dir)
+        scan_time = time.perf_counter() - started
+        changed, removed = diff_snapshots(state, current)
+        state = current
+        if not changed and not removed:
+            continue
+
+        started = time.perf_counter()
+        try:
+            rebuild(changed, removed, content_dir, static_dir, public_dir, template_path)
+        except Exception:
+            # A broken page must not stop the server; show the error and keep watching
+            logger.exception("Rebuild failed")
+            continue
+        notifier.notify()
+        logger.info("Rebuilt %d file(s) in %.0f ms", len(changed) + len(removed), (time.perf_counter() - started) * 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the site, serve public/ and rebuild on change.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.25,
+        help="minimum seconds between polls of content/ and static/",
+    )
+    parser.add_argument("-v", "--verbose", action="count", default=1, help="show per-file build output")
+    args = parser.parse_args(argv)
+    build.configure_logging(args.verbose)
+
+    public_dir = "public"
+    static_dir = "static"
+    content_dir = "content"
+    template_path = os.path.join(static_dir, "template.html")
+
+    build.main(["--incremental"])
+
+    notifier = ReloadNotifier()
+    handler = functools.partial(DevRequestHandler, directory=public_dir)
+    DevRequestHandler.notifier = notifier
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+
+    watcher = threading.Thread(
+        target=watch,
+        args=(notifier, content_dir, static_dir, public_dir, template_path, args.interval),
+        daemon=True,
+    )
+    watcher.start()
+
+    logger.info("Serving %s/ at http://%s:%d/", public_dir, args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
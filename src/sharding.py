@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from build_manifest import hash_file
+from deploy_manifest import remove_unexpected, replace_if_changed, scan_outputs
+
+SHARD_MANIFEST_VERSION = 1
+# Written into every shard's output directory, and never copied into the merged site
+SHARD_MANIFEST = ".shard.json"
+
+logger = logging.getLogger(__name__)
+
+
+class ShardMergeError(Exception):
+    """
+    Raised when shard outputs cannot be merged: a shard is missing or listed twice,
+    two shards produced different bytes for the same file, or a file no longer
+    matches its shard manifest.
+    :param problems: A list of human-readable descriptions, one per problem.
+    """
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__(f"{len(problems)} problem(s) merging shards:\n" + "\n".join(problems))
+
+
+def parse_shard(text):
+    """
+    Parses a shard spec such as '2/4' (the second of four shards).
+    :return: A tuple (index, count), with index counting from 1.
+    :raises ValueError: If the spec is malformed or the index is out of range.
+    """
+    index, sep, count = text.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Shard must look like K/N, e.g. 1/4: {text!r}")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}: {text!r}")
+    return index, count
+
+
+def shard_of(src_path, count):
+    """
+    The shard a page belongs to, from a hash of its source path. The same path lands
+    in the same shard on every machine and run, whatever order pages are found in.
+    :param src_path: The page's source path, e.g. content/blog/index.md.
+    :param count: The number of shards.
+    :return: The shard index, counting from 1.
+    """
+    key = src_path.replace(os.sep, "/").encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % count + 1
+
+
+# The (index, count) this process builds, or None to build every page
+_shard = None
+
+
+def set_shard(shard):
+    global _shard
+    _shard = shard
+
+
+def get_shard():
+    return _shard
+
+
+def includes(src_path):
+    """
+    Whether this build renders a page: always, unless the build is sharded.
+    """
+    return _shard is None or shard_of(src_path, _shard[1]) == _shard[0]
+
+
+def is_primary():
+    """
+    Whether this build produces the site-wide outputs (static files, search index).
+    Only the first shard of a sharded build does.
+    """
+    return _shard is None or _shard[0] == 1
+
+
+def write_shard_manifest(output_dir):
+    """
+    Lists every file of a shard's output with its hash, for merge_shards().
+    Hashes from the previous manifest are reused for files whose size and mtime match.
+    """
+    path = os.path.join(output_dir, SHARD_MANIFEST)
+    try:
+        with open(path, 'r') as f:
+            previous = json.load(f).get("files", {})
+    except (OSError, ValueError, AttributeError):
+        previous = {}
+    files = scan_outputs(output_dir, previous)
+    files.pop(SHARD_MANIFEST, None)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(
+            {"version": SHARD_MANIFEST_VERSION, "shard": list(_shard), "files": files},
+            f,
+            indent=1,
+            sort_keys=True,
+        )
+    os.replace(tmp_path, path)
+    logger.info("Shard %d/%d: %d file(s)", _shard[0], _shard[1], len(files))
+
+
+def read_shard_manifest(shard_dir):
+    """
+    :return: The manifest dict of a shard's output directory.
+    :raises ShardMergeError: If it is missing, corrupt or from another version.
+    """
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ShardMergeError([f"Cannot read shard manifest {path}: {e}"]) from None
+    if not isinstance(data, dict) or data.get("version") != SHARD_MANIFEST_VERSION:
+        raise ShardMergeError([f"Unsupported shard manifest: {path}"])
+    return data
+
+
+def merge_shards(shard_dirs, output_dir):
+    """
+    Combines the outputs of every shard of a build into one site. Everything is
+    checked before output_dir is touched: all N shards must be present exactly once,
+    a file produced by several shards (such as a shared asset) must have the same
+    bytes in each, and every file must still match its shard's manifest. Files
+    already identical in output_dir are kept, and files no shard produced are removed.
+    :param shard_dirs: The output directories of the shards, in any order.
+    :param output_dir: The directory to merge into (e.g., 'public').
+    :return: The number of files in the merged site.
+    :raises ShardMergeError: If the shards cannot be merged.
+    """
+    problems = []
+    manifests = [(shard_dir, read_shard_manifest(shard_dir)) for shard_dir in shard_dirs]
+
+    counts = {manifest["shard"][1] for _, manifest in manifests}
+    if len(counts) > 1:
+        raise ShardMergeError([f"Shards come from builds with different shard counts: {sorted(counts)}"])
+    count = counts.pop()
+    indexes = sorted(manifest["shard"][0] for _, manifest in manifests)
+    for index in range(1, count + 1):
+        if index not in indexes:
+            problems.append(f"Missing shard {index}/{count}")
+        elif indexes.count(index) > 1:
+            problems.append(f"Shard {index}/{count} given {indexes.count(index)} times")
+
+    # Relative path -> (sha256, shard directory of its first producer)
+    owners = {}
+    for shard_dir, manifest in manifests:
+        for rel_path, entry in sorted(manifest["files"].items()):
+            owner = owners.get(rel_path)
+            if owner is None:
+                owners[rel_path] = (entry[0], shard_dir)
+            elif owner[0] != entry[0]:
+                problems.append(f"Conflict: {rel_path} differs between {owner[1]} and {shard_dir}")
+    for rel_path, (digest, shard_dir) in sorted(owners.items()):
+        path = os.path.join(shard_dir, rel_path)
+        if not os.path.isfile(path) or hash_file(path) != digest:
+            problems.append(f"{path} does not match its shard manifest")
+    if problems:
+        raise ShardMergeError(problems)
+
+    expected = set()
+    for rel_path, (_, shard_dir) in sorted(owners.items()):
+        dest_path = os.path.join(output_dir, rel_path)
+        expected.add(os.path.normpath(dest_path))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = dest_path + ".tmp"
+        shutil.copyfile(os.path.join(shard_dir, rel_path), tmp_path)
+        if replace_if_changed(tmp_path, dest_path):
+            logger.debug("Merged: %s", dest_path)
+    remove_unexpected(output_dir, expected)
+    return len(owners)
+
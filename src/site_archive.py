@@ -0,0 +1,163 @@
+import gzip
+import io
+import logging
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+
+# Archive formats by file name suffix
+FORMATS = {".zip": "zip", ".tar": "tar", ".tar.gz": "tar.gz", ".tgz": "tar.gz"}
+# The oldest timestamp a zip entry can hold
+ZIP_EPOCH = 315532800
+
+logger = logging.getLogger(__name__)
+
+
+def archive_format(path):
+    """
+    :return: 'zip', 'tar' or 'tar.gz', from the path's suffix.
+    :raises ValueError: For any other suffix.
+    """
+    for suffix, name in FORMATS.items():
+        if path.endswith(suffix):
+            return name
+    raise ValueError(f"Archive must end in one of {', '.join(FORMATS)}: {path}")
+
+
+def entry_mtime():
+    """
+    The timestamp of every entry: $SOURCE_DATE_EPOCH when set, as for other
+    reproducible builds, and otherwise 0 (1980 for zip, which cannot go earlier).
+    """
+    return int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+
+
+class SiteArchive:
+    """
+    Writes the site straight into a .tar, .tar.gz or .zip instead of public/.
+    Callers pass the path a file would have had on disk; it is stored relative to
+    root. Entries are stored in the order they are written (the build writes in a
+    deterministic order) with a fixed timestamp, owner and mode, so the same inputs
+    give a byte-identical archive. The archive is written under a temporary name
+    and only appears at its path once close() succeeds.
+    :param path: The archive to create.
+    :param root: The directory the written paths are relative to (e.g., 'public').
+    """
+
+    def __init__(self, path, root):
+        self.path = path
+        self.root = root
+        self.format = archive_format(path)
+        self.mtime = entry_mtime()
+        self.names = set()
+        self.tmp_path = path + ".tmp"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.raw = open(self.tmp_path, 'wb')
+        self.gzip = None
+        if self.format == "zip":
+            self.zip = zipfile.ZipFile(self.raw, "w", zipfile.ZIP_DEFLATED)
+        else:
+            fileobj = self.raw
+            if self.format == "tar.gz":
+                # No file name and a fixed mtime in the gzip header either
+                self.gzip = fileobj = gzip.GzipFile(filename="", mode="wb", fileobj=self.raw, mtime=self.mtime)
+            self.tar = tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def _name(self, dest_path):
+        name = os.path.relpath(dest_path, self.root).replace(os.sep, "/")
+        if name in self.names:
+            raise ValueError(f"Two outputs are written to {dest_path}")
+        self.names.add(name)
+        return name
+
+    def _add(self, name, size, stream):
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, time.gmtime(max(self.mtime, ZIP_EPOCH))[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3  # Unix, whatever the build machine
+            info.external_attr = 0o100644 << 16
+            with self.zip.open(info, "w") as dest:
+                shutil.copyfileobj(stream, dest, 1 << 20)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = self.mtime
+            info.mode = 0o644
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            self.tar.addfile(info, stream)
+
+    def write_bytes(self, dest_path, data):
+        self._add(self._name(dest_path), len(data), io.BytesIO(data))
+
+    def write_text(self, dest_path, text):
+        self.write_bytes(dest_path, text.encode())
+
+    def write_file(self, dest_path, src_path):
+        """
+        Streams a file into the archive without reading it into memory.
+        """
+        name = self._name(dest_path)
+        with open(src_path, 'rb') as f:
+            self._add(name, os.fstat(f.fileno()).st_size, f)
+
+    def close(self):
+        if self.format == "zip":
+            self.zip.close()
+        else:
+            self.tar.close()
+            if self.gzip is not None:
+                self.gzip.close()
+        self.raw.close()
+        os.replace(self.tmp_path, self.path)
+        logger.info("Archive written: %s (%d files)", self.path, len(self.names))
+
+    def abort(self):
+        # Leaves no partial archive behind. The archive layers are closed first, while
+        # the file under them is still open, so they have nothing left to flush when
+        # they are garbage collected.
+        layers = [self.zip] if self.format == "zip" else [self.tar, self.gzip]
+        for layer in layers:
+            if layer is None:
+                continue
+            try:
+                layer.close()
+            except Exception:
+                # E.g. an entry still open for writing; the file is discarded anyway
+                pass
+        self.raw.close()
+        os.remove(self.tmp_path)
+
+
+# The archive the build writes into, or None to write files into the output directory
+_archive = None
+
+
+def open_archive(path, root):
+    """
+    Sends this process's outputs into an archive until close_archive().
+    """
+    global _archive
+    _archive = SiteArchive(path, root)
+
+
+def get_archive():
+    return _archive
+
+
+def close_archive(success=True):
+    """
+    Finishes the archive, or discards it when the build failed.
+    """
+    global _archive
+    if _archive is None:
+        return
+    archive, _archive = _archive, None
+    if success:
+        archive.close()
+    else:
+        archive.abort()
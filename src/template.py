@@ -0,0 +1,339 @@
+import hashlib
+import os
+import re
+import minify
+
+# The values a page fills in. Any other {{ name }} is left as it is, since pages may
+# carry text such as an inline Vue or Handlebars snippet that uses the same braces.
+SLOT_NAMES = ("Title", "Content")
+
+# Matches every tag: placeholders such as {{ Title }} or {{Content}}, {{> header }}, {{ extends base }}, {{ block name }} and {{ endblock }}
+TAG_PATTERN = re.compile(
+    r"\{\{\s*(?:>\s*(?P<include>[\w/-]+)|extends\s+(?P<extends>[\w/-]+)"
+    r"|block\s+(?P<block>\w+)|(?P<endblock>endblock)|(?P<slot>" + "|".join(SLOT_NAMES) + r"))\s*\}\}"
+)
+
+
+class TemplateError(Exception):
+    """
+    Raised for a template that cannot be compiled, e.g. an unknown layout or an
+    unclosed block.
+    """
+
+
+def parse(source):
+    """
+    Splits template text into a tree of nodes.
+    :param source: The template text.
+    :return: A tuple (parent, nodes): the name given to {{ extends }} (or None) and a
+        list of ("text", str), ("slot", name), ("include", name) and
+        ("block", name, nodes) tuples.
+    :raises TemplateError: On unbalanced blocks or a misplaced extends tag.
+    """
+    parent = None
+    root = []
+    # Each open block's (name, nodes); the bottom entry is the template itself
+    stack = [(None, root)]
+    start_idx = 0
+    for match in TAG_PATTERN.finditer(source):
+        nodes = stack[-1][1]
+        if match.start() > start_idx:
+            nodes.append(("text", source[start_idx:match.start()]))
+        start_idx = match.end()
+        if match.group("slot"):
+            nodes.append(("slot", match.group("slot")))
+        elif match.group("include"):
+            nodes.append(("include", match.group("include")))
+        elif match.group("block"):
+            stack.append((match.group("block"), []))
+        elif match.group("endblock"):
+            if len(stack) == 1:
+                raise TemplateError("{{ endblock }} without a block")
+            name, children = stack.pop()
+            stack[-1][1].append(("block", name, children))
+        else:
+            if parent is not None or len(stack) > 1 or any(
+                node[0] != "text" or node[1].strip() for node in root
+            ):
+                raise TemplateError("{{ extends }} must be the first tag of a template")
+            parent = match.group("extends")
+    if len(stack) > 1:
+        raise TemplateError(f"Unclosed block: {stack[-1][0]}")
+    if start_idx < len(source):
+        root.append(("text", source[start_idx:]))
+    return parent, root
+
+
+def _collect_blocks(nodes, blocks):
+    # Every block of a child layout, including blocks nested in other blocks
+    for node in nodes:
+        if node[0] == "block":
+            blocks.setdefault(node[1], node[2])
+            _collect_blocks(node[2], blocks)
+    return blocks
+
+
+def _parse_named(source, name):
+    # parse(), with the template's name (or path) in the error message
+    try:
+        return parse(source)
+    except TemplateError as e:
+        if name is None:
+            raise
+        raise TemplateError(f"{name}: {e}") from None
+
+
+def _compile_chain(source, loader, seen, name):
+    # Follows {{ extends }} up to the root layout, collecting the block overrides of
+    # every level; the most derived definition of a block wins
+    overrides = {}
+    while True:
+        parent, nodes = _parse_named(source, name)
+        if parent is None:
+            return nodes, overrides
+        for name, children in _collect_blocks(nodes, {}).items():
+            overrides.setdefault(name, children)
+        if loader is None:
+            raise TemplateError(f"Cannot load layout {parent!r} without a template loader")
+        if parent in seen:
+            raise TemplateError(f"Template extends itself: {parent}")
+        seen += (parent,)
+        source = loader(parent)
+        name = parent
+
+
+def _flatten(compiled, overrides, loader, including):
+    # Resolves blocks and partials into one list of ("text", str) and ("slot", name)
+    nodes, chain_overrides = compiled
+    overrides = {**chain_overrides, **overrides}
+    parts = []
+    # An explicit stack, since partials and blocks nest arbitrarily deep
+    stack = [iter(nodes)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        kind = node[0]
+        if kind == "text" or kind == "slot":
+            parts.append(node)
+        elif kind == "block":
+            stack.append(iter(overrides.get(node[1], node[2])))
+        else:
+            name = node[1]
+            if loader is None:
+                raise TemplateError(f"Cannot include {name!r} without a template loader")
+            if name in including:
+                raise TemplateError(f"Partial includes itself: {name}")
+            # A partial is compiled on its own, so it may extend a layout of its own
+            # but does not see the including template's blocks
+            partial = _compile_chain(loader(name), loader, (), name)
+            parts.extend(_flatten(partial, {}, loader, including + (name,)))
+    return parts
+
+
+class Template:
+    """
+    A template pre-split into literal segments and named slots.
+    Rendering fills the slots in a single pass, so placeholder-like text inside
+    the substituted values is never touched.
+    Layouts and partials are resolved when the template is compiled: a template
+    starting with {{ extends base }} is base with its {{ block name }}...{{ endblock }}
+    sections replaced by the child's, and {{> header }} is replaced by the header
+    partial. The compiled template is again just segments and slots, so rendering
+    costs the same however many layouts and partials went into it.
+    """
+
+    def __init__(self, source, loader=None, name=None):
+        """
+        :param source: The template text.
+        :param loader: A function from a template name (e.g. 'base') to its source,
+            used for {{ extends }} and {{> partial }} tags; see TemplateLoader.
+        :param name: What errors call the template, e.g. its path.
+        :raises TemplateError: If the template uses a tag it cannot resolve; the
+            message names the template, layout or partial at fault.
+        """
+        self.segments = []  # Literal strings; segments[i] comes before slots[i]
+        self.slots = []
+        parts = _flatten(_compile_chain(source, loader, (), name), {}, loader, ())
+        literal = []
+        for kind, value in parts:
+            if kind == "text":
+                literal.append(value)
+            else:
+                self.segments.append("".join(literal))
+                self.slots.append(value)
+                literal = []
+        self.segments.append("".join(literal))
+
+    def render_parts(self, values):
+        """
+        Yields the template's pieces in order with every slot filled.
+        :param values: A dict mapping slot names (e.g. 'Title') to strings.
+        :raises KeyError: If a slot has no value.
+        """
+        for segment, slot in zip(self.segments, self.slots):
+            yield segment
+            yield values[slot]
+        yield self.segments[-1]
+
+    def render_to(self, stream, values):
+        """
+        Writes the filled template to a file object.
+        :param stream: Any object with a write() method.
+        :param values: A dict mapping slot names to strings, or to callables that write
+            the slot's content to the stream themselves (e.g. HTMLNode.render_to), so
+            it is never built as one string.
+        :raises KeyError: If a slot has no value.
+        """
+        for segment, slot in zip(self.segments, self.slots):
+            stream.write(segment)
+            value = values[slot]
+            if isinstance(value, str):
+                stream.write(value)
+            else:
+                value(stream)
+        stream.write(self.segments[-1])
+
+    def render(self, values):
+        """
+        Fills the template and returns the page as one string.
+        :param values: A dict mapping slot names (e.g. 'Title') to strings.
+        """
+        return "".join(self.render_parts(values))
+
+
+# The directory named templates, layouts and partials are loaded from, or None to use
+# the directory of the default template
+_template_dir = None
+
+
+def set_template_dir(path):
+    global _template_dir
+    _template_dir = path
+
+
+def get_template_dir():
+    return _template_dir
+
+
+def template_path_for(default_path, name):
+    """
+    The file a page's template comes from.
+    :param default_path: The site's default template (e.g. static/template.html).
+    :param name: The template name from the page's front matter, or None for the default.
+    """
+    if not name:
+        return default_path
+    directory = _template_dir if _template_dir is not None else os.path.dirname(default_path)
+    return os.path.join(directory, name + ".html")
+
+
+# Template sources as compiled (minified when minification is on), keyed by path and
+# validated against mtime and size, so a partial shared by many templates is read once
+_source_cache = {}
+
+
+def read_source(path):
+    """
+    Reads a template file, minified when minification is on.
+    :raises FileNotFoundError: If the file does not exist.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, minify.is_enabled())
+    cached = _source_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, 'r') as f:
+        source = f.read()
+    if minify.is_enabled():
+        source = minify.cached("html", source, minify.minify_html)
+    _source_cache[path] = (key, source)
+    return source
+
+
+class TemplateLoader:
+    """
+    Resolves the layouts and partials a template refers to by name, keeping track
+    of every file used so the compiled template can be checked for changes.
+    :param directory: The directory the names are resolved in.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.dependencies = []
+
+    def __call__(self, name):
+        path = os.path.join(self.directory, name + ".html")
+        try:
+            source = read_source(path)
+        except FileNotFoundError:
+            raise TemplateError(f"Template not found: {path}") from None
+        if path not in self.dependencies:
+            self.dependencies.append(path)
+        return source
+
+
+def _stat_key(paths):
+    keys = []
+    for path in paths:
+        stat = os.stat(path)
+        keys.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(keys)
+
+
+# Compiled templates, keyed by path and validated against the mtime and size of the
+# file and of every layout and partial it uses
+_template_cache = {}
+
+
+def _cached_entry(template_path):
+    # Returns (key, template, digest, files) for an up-to-date compiled template
+    cached = _template_cache.get(template_path)
+    if cached is not None:
+        try:
+            if cached[0] == (_stat_key(cached[3]), minify.is_enabled()):
+                return cached
+        except FileNotFoundError:
+            pass
+
+    loader = TemplateLoader(_template_dir if _template_dir is not None else os.path.dirname(template_path))
+    template = Template(read_source(template_path), loader, template_path)
+    files = [template_path] + loader.dependencies
+    # Hash every file the template was compiled from, in the order they were used
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(path.encode() + b"\0")
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    entry = ((_stat_key(files), minify.is_enabled()), template, digest.hexdigest(), files)
+    _template_cache[template_path] = entry
+    return entry
+
+
+def load_template(template_path):
+    """
+    Returns the compiled template for a path, reading and compiling it only once
+    per process unless the file, or a layout or partial it uses, changes on disk.
+    With minification on, every file is minified before it is compiled.
+    :param template_path: The path to the HTML template file.
+    :return: A Template.
+    :raises TemplateError: If the template or one of its layouts cannot be compiled.
+    """
+    return _cached_entry(template_path)[1]
+
+
+def template_hash(template_path):
+    """
+    The SHA-256 hex digest of a template together with all of its layouts and
+    partials, so editing a partial changes the hash of every template that uses it.
+    """
+    return _cached_entry(template_path)[2]
+
+
+def template_files(template_path):
+    """
+    The files a compiled template was built from: the template itself, then every
+    layout and partial it uses.
+    """
+    return _cached_entry(template_path)[3]
@@ -1,3 +1,5 @@
+import io
+import sys
 import unittest
 from HTMLNode import *
 
@@ -21,6 +23,22 @@ class TestHTMLNode(unittest.TestCase):
             "HTMLNode(tag:a, value:Click here, children:[], props:{'href': 'https://www.example.com'})"
         )
 
+class TestLeafNode(unittest.TestCase):
+
+    def test_leaves_share_empty_defaults(self):
+        first = LeafNode("b", "Bold")
+        second = LeafNode(None, "Text")
+        self.assertIs(first.props, second.props)
+        self.assertIs(first.children, second.children)
+        self.assertEqual(first.props, {})
+        self.assertFalse(hasattr(first, "__dict__"))
+
+    def test_shared_props_are_read_only(self):
+        node = LeafNode("b", "Bold")
+        with self.assertRaises(TypeError):
+            node.props["class"] = "x"
+        self.assertEqual(LeafNode("i", "Italic").props_to_html(), "")
+
 class TestParentNode(unittest.TestCase):
 
     def test_parentnode_with_children(self):
@@ -57,5 +75,24 @@ class TestParentNode(unittest.TestCase):
         expected_html = "<div><section><h1>Title</h1>Content</section><p>Paragraph text</p></div>"
         self.assertEqual(node.to_html(), expected_html)
 
+    def test_render_to_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "Text "), LeafNode("a", "link", {"href": "/x"})]),
+                LeafNode("img", "", {"src": "/a.png", "alt": "A"}),
+            ]
+        )
+        buffer = io.StringIO()
+        node.render_to(buffer, buffer_size=4)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+
+    def test_deep_nesting_does_not_recurse(self):
+        node = LeafNode(None, "x")
+        for _ in range(5 * sys.getrecursionlimit()):
+            node = ParentNode("span", [node])
+        depth = 5 * sys.getrecursionlimit()
+        self.assertEqual(node.to_html(), "<span>" * depth + "x" + "</span>" * depth)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import benchmark
+from benchmark import compare, generate_corpus
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.baseline = os.path.join(self.tmp.name, "benchmark.json")
+
+    def test_compare_threshold(self):
+        baseline = {"stages": {"parse": 1.0, "render": 2.0, "write": 0.5}}
+        results = {"stages": {"parse": 1.3, "render": 2.2, "write": 0.4}}
+        self.assertEqual(compare(results, baseline, 0.2), [("parse", 1.0, 1.3)])
+        self.assertEqual(compare(results, baseline, 0.5), [])
+
+    def test_compare_skips_stages_missing_from_the_baseline(self):
+        results = {"stages": {"parse": 1.0, "new stage": 5.0}}
+        self.assertEqual(compare(results, {"stages": {"parse": 1.0}}, 0.2), [])
+        self.assertEqual(compare(results, {"stages": {}}, 0.2), [])
+
+    def test_generate_corpus_is_reproducible(self):
+        first = generate_corpus(os.path.join(self.tmp.name, "a"), 12, 5, 0.3, seed=7)
+        second = generate_corpus(os.path.join(self.tmp.name, "b"), 12, 5, 0.3, seed=7)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 12)
+        self.assertNotEqual(generate_corpus(os.path.join(self.tmp.name, "c"), 12, 5, 0.3, seed=8), first)
+        with open(os.path.join(self.tmp.name, "b", "section3", "part3", "page3.md")) as f:
+            self.assertEqual(f.read(), first[3])
+
+    def run_main(self, stages, *args):
+        output = io.StringIO()
+        with mock.patch("benchmark.run_benchmarks", return_value=stages), redirect_stdout(output):
+            benchmark.main(["--pages", "1", "--baseline", self.baseline, *args])
+        return output.getvalue()
+
+    def test_main_baseline_handling(self):
+        self.assertIn("No baseline", self.run_main({"parse": 1.0}))
+        self.assertFalse(os.path.exists(self.baseline))
+
+        self.run_main({"parse": 1.0}, "--save")
+        with open(self.baseline) as f:
+            self.assertEqual(json.load(f)["stages"], {"parse": 1.0})
+
+        self.assertIn("No stage regressed", self.run_main({"parse": 1.1}))
+        with self.assertRaises(SystemExit) as cm:
+            self.run_main({"parse": 1.5})
+        self.assertEqual(cm.exception.code, 1)
+
+        # A baseline of a different corpus is not compared against
+        with self.assertRaisesRegex(SystemExit, "different corpus"):
+            self.run_main({"parse": 1.0}, "--seed", "2")
+
+if __name__ == '__main__':
+    unittest.main()
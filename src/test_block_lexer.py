@@ -0,0 +1,61 @@
+import io
+import unittest
+
+from block_lexer import iter_blocks, markdown_to_blocks, block_to_block_type
+from markdown_to_html import markdown_to_html_node
+
+
+class TestBlockLexer(unittest.TestCase):
+
+    def test_reads_from_file_object(self):
+        stream = io.StringIO("# Title\n\nSome *text*\nmore\n\n* a\n* b\n")
+        blocks = list(iter_blocks(stream))
+        self.assertEqual(
+            blocks,
+            [
+                ("heading", ["# Title"]),
+                ("paragraph", ["Some *text*", "more"]),
+                ("unordered_list", ["* a", "* b"]),
+            ],
+        )
+
+    def test_fenced_code_keeps_blank_lines(self):
+        markdown = "Intro\n\n```\nfirst\n\n  indented\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(markdown),
+            ["Intro", "```\nfirst\n\n  indented\n```", "Outro"],
+        )
+        node = markdown_to_html_node(markdown)
+        self.assertEqual(node.children[1].to_html(), "<pre><code>first\n\n  indented\n</code></pre>")
+
+    def test_only_a_bare_fence_closes_code(self):
+        markdown = "```\nprint(1)\n```not the end\n\nstill code\n```"
+        self.assertEqual(markdown_to_blocks(markdown), [markdown])
+        node = markdown_to_html_node(markdown)
+        self.assertEqual(len(node.children), 1)
+        self.assertIn("not the end\n\nstill code\n", node.children[0].to_html())
+
+    def test_indented_closing_fence(self):
+        blocks = list(iter_blocks(["```", "code", "   ```", "after"]))
+        self.assertEqual(blocks, [("code", ["```", "code", "   ```"]), ("paragraph", ["after"])])
+        node = markdown_to_html_node("- item\n\n```\ncode\n  ```\n\nText")
+        self.assertEqual(node.children[1].to_html(), "<pre><code>code\n</code></pre>")
+
+    def test_single_line_code_block(self):
+        self.assertEqual(block_to_block_type("```code```"), "code")
+        node = markdown_to_html_node("```code```")
+        self.assertEqual(node.children[0].to_html(), "<pre><code>code</code></pre>")
+
+    def test_unclosed_fence_is_not_code(self):
+        blocks = list(iter_blocks(["```", "text", "", "more"]))
+        self.assertEqual(blocks, [("paragraph", ["```", "text"]), ("paragraph", ["more"])])
+
+    def test_blocks_are_trimmed(self):
+        self.assertEqual(markdown_to_blocks("\n\n   Indented\nline   \n\n\n"), ["Indented\nline"])
+
+    def test_mixed_list_markers_are_a_paragraph(self):
+        self.assertEqual(block_to_block_type("* a\n- b"), "paragraph")
+        self.assertEqual(block_to_block_type("1. a\n3. b"), "paragraph")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import image_probe
+from build_manifest import BuildManifest
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+
+
+class TestBuildManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = self._write("template.html", "<html>{{ Content }}</html>")
+        self.source = self._write("content/index.md", "# Title")
+        self.output = self._write("public/index.html", "<html></html>")
+        self.manifest_path = os.path.join(self.root, "cache", "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def _build(self):
+        manifest = BuildManifest(self.manifest_path, self.template)
+        current, source_hash = manifest.is_current(self.source, self.output)
+        if not current:
+            manifest.record(self.source, source_hash, self.output)
+        manifest.save()
+        return current
+
+    def test_unchanged_page_is_current(self):
+        self.assertFalse(self._build())
+        self.assertTrue(self._build())
+
+    def test_source_change_invalidates(self):
+        self._build()
+        self._write("content/index.md", "# New title")
+        self.assertFalse(self._build())
+
+    def test_template_change_invalidates(self):
+        self._build()
+        self._write("template.html", "<body>{{ Content }}</body>")
+        self.assertFalse(self._build())
+
+    def test_only_pages_using_a_changed_template_are_invalidated(self):
+        self._write("post.html", "<article>{{ Content }}</article>")
+        post = self._write("content/post.md", "---\ntemplate: post\n---\n# Post")
+        post_output = self._write("public/post.html", "<article></article>")
+        manifest = BuildManifest(self.manifest_path, self.template)
+        for src_path, dest_path in ((self.source, self.output), (post, post_output)):
+            manifest.record(src_path, manifest.is_current(src_path, dest_path)[1], dest_path)
+        manifest.save()
+
+        self._write("post.html", "<section>{{ Content }}</section>")
+        manifest = BuildManifest(self.manifest_path, self.template)
+        self.assertTrue(manifest.is_current(self.source, self.output)[0])
+        self.assertFalse(manifest.is_current(post, post_output)[0])
+
+    def test_resized_image_invalidates(self):
+        static_dir = os.path.join(self.root, "static")
+        image = os.path.join(static_dir, "images", "a.png")
+        os.makedirs(os.path.dirname(image))
+        with open(image, 'wb') as f:
+            f.write(png(1344, 896))
+        image_probe.enable(static_dir, os.path.join(self.root, "cache", "images.json"))
+        self.addCleanup(image_probe.disable)
+        self._write("content/index.md", "# Title\n\n![Rivendell](/images/a.png)")
+        self._build()
+        self.assertTrue(self._build())
+
+        with open(image, 'wb') as f:
+            f.write(png(10, 20))
+        os.utime(image, ns=(0, 1))
+        self.assertFalse(self._build())
+
+    def test_removed_source_deletes_output(self):
+        self._build()
+        manifest = BuildManifest(self.manifest_path, self.template)
+        removed = manifest.remove_stale(os.path.join(self.root, "public"))
+        self.assertEqual(removed, [self.output])
+        self.assertFalse(os.path.exists(self.output))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "public")))
+
+if __name__ == '__main__':
+    unittest.main()
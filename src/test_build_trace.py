@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import build_trace
+from build_trace import span
+
+
+class TestBuildTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Tracing has no off switch; leave it off for the other tests
+        self.addCleanup(setattr, build_trace, "_events", None)
+
+    def test_span_does_nothing_while_disabled(self):
+        with span("read", path="a.md"):
+            pass
+        self.assertFalse(build_trace.is_enabled())
+        self.assertEqual(build_trace.take_events(), [])
+
+    def test_span_records_a_complete_event(self):
+        build_trace.enable()
+        with self.assertRaises(ValueError):
+            with span("render", path="a.md"):
+                raise ValueError("broken page")
+        [event] = build_trace.take_events()
+        self.assertEqual(event["name"], "render")
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["args"], {"path": "a.md"})
+        self.assertEqual(event["pid"], os.getpid())
+        self.assertGreaterEqual(event["dur"], 0)
+        self.assertEqual(build_trace.take_events(), [])
+
+    def test_worker_events_are_merged(self):
+        build_trace.enable()
+        with span("parent"):
+            pass
+        worker = [{"name": "worker", "ph": "X", "ts": 1, "dur": 2, "pid": 1, "tid": 1, "args": {}}]
+        build_trace.add_events(worker)
+        self.assertEqual([event["name"] for event in build_trace.take_events()], ["parent", "worker"])
+
+    def test_save_writes_trace_event_json(self):
+        build_trace.enable()
+        with span("write", path="a.html"):
+            pass
+        path = os.path.join(self.tmp.name, "trace.json")
+        build_trace.save(path)
+        with open(path) as f:
+            trace = json.load(f)
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+        self.assertEqual([event["name"] for event in trace["traceEvents"]], ["write"])
+
+    def build(self, *args):
+        # A whole build in a separate process, so its global state stays there
+        site = self.tmp.name
+        os.makedirs(os.path.join(site, "content"))
+        os.makedirs(os.path.join(site, "static"))
+        with open(os.path.join(site, "content", "index.md"), 'w') as f:
+            f.write("# Home\n\nHello")
+        with open(os.path.join(site, "static", "template.html"), 'w') as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        return subprocess.run(
+            [sys.executable, main, *args], cwd=site, capture_output=True, text=True, check=True
+        )
+
+    def test_default_build_prints_nothing(self):
+        result = self.build()
+        self.assertEqual(result.stdout, "")
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "public", "index.html")))
+
+    def test_traced_build(self):
+        result = self.build("-j", "2", "--trace", "trace.json")
+        self.assertEqual(result.stdout, "")
+        with open(os.path.join(self.tmp.name, "trace.json")) as f:
+            names = {event["name"] for event in json.load(f)["traceEvents"]}
+        # Spans recorded in the workers are merged into the parent's trace
+        self.assertIn("render", names)
+        self.assertIn("copy static", names)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import precompress
+from copy_static_files import copy_file, copy_static_files, sync_static_files
+
+
+class TestCopyStaticFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(precompress.finish)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.record = os.path.join(self.tmp.name, "cache", "static.json")
+        self.write(os.path.join(self.static, "template.html"), "<main>{{ Content }}</main>")
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def sync(self, **kwargs):
+        return sync_static_files(self.static, self.public, self.record, jobs=2, **kwargs)
+
+    def test_copy_file(self):
+        src = self.write(os.path.join(self.tmp.name, "a.css"), "body {}")
+        os.utime(src, ns=(0, 1000))
+        dest = os.path.join(self.tmp.name, "b.css")
+        copy_file(src, dest)
+        self.assertEqual(self.read(dest), "body {}")
+        self.assertEqual(os.stat(dest).st_mtime_ns, 1000)
+        self.assertFalse(os.path.exists(dest + ".tmp"))
+
+    def test_copy_file_falls_back_without_copy_file_range(self):
+        src = self.write(os.path.join(self.tmp.name, "a.css"), "body {}" * 1000)
+        dest = os.path.join(self.tmp.name, "b.css")
+        with mock.patch("os.copy_file_range", side_effect=OSError, create=True):
+            copy_file(src, dest)
+        self.assertEqual(self.read(dest), "body {}" * 1000)
+
+    def test_copy_file_replaces_a_hardlink(self):
+        src = self.write(os.path.join(self.tmp.name, "a.css"), "new")
+        linked = self.write(os.path.join(self.tmp.name, "linked.css"), "old")
+        dest = os.path.join(self.tmp.name, "b.css")
+        os.link(linked, dest)
+        copy_file(src, dest)
+        self.assertEqual(self.read(dest), "new")
+        self.assertEqual(self.read(linked), "old")
+
+    def test_sync_copies_changed_files_and_removes_stale_ones(self):
+        css = self.write(os.path.join(self.static, "index.css"), "body {}")
+        logo = self.write(os.path.join(self.static, "images", "logo.svg"), "<svg/>")
+        self.assertEqual(self.sync(), (["index.css", os.path.join("images", "logo.svg")], []))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "template.html")))
+        with open(self.record) as f:
+            self.assertEqual(json.load(f), [os.path.join("images", "logo.svg"), "index.css"])
+
+        # Unchanged files are left alone; outputs not synced by it are kept
+        page = self.write(os.path.join(self.public, "index.html"), "<p>page</p>")
+        self.assertEqual(self.sync(), ([], []))
+
+        self.write(css, "body { color: red }")
+        os.remove(logo)
+        self.assertEqual(self.sync(), (["index.css"], [os.path.join("images", "logo.svg")]))
+        self.assertEqual(self.read(os.path.join(self.public, "index.css")), "body { color: red }")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_sync_removes_files_copied_by_a_full_build(self):
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        extra = self.write(os.path.join(self.static, "extra.css"), "p {}")
+        copy_static_files(self.static, self.public, clean=False, record_path=self.record)
+        os.remove(extra)
+        self.assertEqual(self.sync()[1], ["extra.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "extra.css")))
+
+    def test_sync_hardlinks(self):
+        css = self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.sync(hardlink=True)
+        dest = os.path.join(self.public, "index.css")
+        self.assertTrue(os.path.samefile(css, dest))
+
+        # Files that get a .gz are copied, replacing an earlier link
+        precompress.enable(6, 1)
+        self.assertEqual(self.sync(hardlink=True), (["index.css"], []))
+        self.assertFalse(os.path.samefile(css, dest))
+        precompress.finish()
+
+    def test_sync_compresses_after_an_edit_through_a_hardlink(self):
+        css = self.write(os.path.join(self.static, "index.css"), "body {}" * 100)
+        precompress.enable(6, 1)
+        self.sync()
+        precompress.finish()
+        dest = os.path.join(self.public, "index.css")
+        os.remove(dest)
+        os.link(css, dest)
+        os.utime(dest + ".gz", ns=(0, 0))
+
+        with open(css, 'a') as f:
+            f.write("p {}")
+        precompress.enable(6, 1)
+        self.sync(hardlink=True)
+        self.assertEqual(precompress.finish(), 1)
+        self.assertFalse(os.path.samefile(css, dest))
+        self.assertEqual(self.read(dest), "body {}" * 100 + "p {}")
+
+if __name__ == '__main__':
+    unittest.main()
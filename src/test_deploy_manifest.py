@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+
+from deploy_manifest import replace_if_changed, remove_unexpected, write_deploy_manifest
+
+
+class TestDeployManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.public, "blog"))
+        self.state = os.path.join(self.tmp.name, "cache", "deploy.json")
+        self.delta = os.path.join(self.tmp.name, "cache", "deploy-manifest.json")
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_identical_output_is_not_rewritten(self):
+        dest = os.path.join(self.public, "index.html")
+        self.write(dest, "<p>same</p>")
+        os.utime(dest, ns=(0, 1000))
+
+        self.write(dest + ".tmp", "<p>same</p>")
+        self.assertFalse(replace_if_changed(dest + ".tmp", dest))
+        self.assertEqual(os.stat(dest).st_mtime_ns, 1000)
+        self.assertFalse(os.path.exists(dest + ".tmp"))
+
+        self.write(dest + ".tmp", "<p>new</p>")
+        self.assertTrue(replace_if_changed(dest + ".tmp", dest))
+        with open(dest) as f:
+            self.assertEqual(f.read(), "<p>new</p>")
+
+    def test_delta_between_builds(self):
+        self.write(os.path.join(self.public, "index.html"), "home")
+        self.write(os.path.join(self.public, "blog", "old.html"), "old")
+        first = write_deploy_manifest(self.public, self.state, self.delta)
+        self.assertEqual(sorted(first["added"]), ["blog/old.html", "index.html"])
+
+        self.write(os.path.join(self.public, "index.html"), "home v2")
+        self.write(os.path.join(self.public, "new.css"), "css")
+        os.remove(os.path.join(self.public, "blog", "old.html"))
+        second = write_deploy_manifest(self.public, self.state, self.delta)
+        self.assertEqual(list(second["added"]), ["new.css"])
+        self.assertEqual(list(second["changed"]), ["index.html"])
+        self.assertEqual(second["removed"], ["blog/old.html"])
+        with open(self.delta) as f:
+            self.assertEqual(json.load(f), second)
+
+    def test_remove_unexpected(self):
+        keep = os.path.join(self.public, "index.html")
+        stale = os.path.join(self.public, "blog", "old.html")
+        self.write(keep, "home")
+        self.write(stale, "old")
+        self.assertEqual(remove_unexpected(self.public, {os.path.normpath(keep)}), [stale])
+        self.assertTrue(os.path.exists(keep))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+if __name__ == '__main__':
+    unittest.main()
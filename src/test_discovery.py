@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from discovery import ContentScanner, is_ignored, is_ignored_path
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        for rel_path in ("b.md", "a.md", "z/index.md", "docs.md.d/page.md", "drafts/x.md", ".hidden.md", ".git/g.md", "img.png"):
+            self._write(rel_path)
+        self.snapshot = os.path.join(self.tmp.name, "discovery.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, rel_path):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write("# Page")
+
+    def _age_directories(self):
+        # Old enough that their mtimes are trusted by the next scan
+        for root, dirs, files in os.walk(self.content):
+            os.utime(root, ns=(0, 0))
+
+    def test_order_and_ignore_rules(self):
+        scanner = ContentScanner(ignore=(".*", "drafts/*"))
+        self.assertEqual(
+            [rel_path for _, rel_path in scanner.iter_markdown(self.content)],
+            ["a.md", "b.md", "docs.md.d/page.md", "z/index.md"],
+        )
+
+    def test_is_ignored(self):
+        self.assertTrue(is_ignored(".git", ".git", (".*",)))
+        self.assertTrue(is_ignored("x.md", "drafts/x.md", ("drafts/*",)))
+        self.assertFalse(is_ignored("drafts", "drafts", ("drafts/*",)))
+        self.assertFalse(is_ignored("x.md", "blog/x.md", ("drafts/*",)))
+        self.assertTrue(is_ignored_path(".git/g.md", (".*",)))
+        self.assertTrue(is_ignored_path("blog/.#page.md", (".*",)))
+        self.assertFalse(is_ignored_path("blog/page.md", (".*", "drafts/*")))
+
+    def test_snapshot_skips_unchanged_directories(self):
+        self._age_directories()
+        scanner = ContentScanner(self.snapshot)
+        pages = list(scanner.iter_markdown(self.content))
+        scanner.save()
+
+        scanner = ContentScanner(self.snapshot)
+        self.assertEqual(list(scanner.iter_markdown(self.content)), pages)
+        self.assertEqual((scanner.listed, scanner.reused), (0, 4))
+
+        self._write("z/new.md")
+        scanner = ContentScanner(self.snapshot)
+        self.assertIn("z/new.md", [rel_path for _, rel_path in scanner.iter_markdown(self.content)])
+        self.assertEqual(scanner.listed, 1)
+
+    def test_recent_directories_are_listed_again(self):
+        scanner = ContentScanner(self.snapshot)
+        list(scanner.iter_markdown(self.content))
+        scanner.save()
+        scanner = ContentScanner(self.snapshot)
+        list(scanner.iter_markdown(self.content))
+        self.assertEqual(scanner.reused, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import doc_cache
+from doc_cache import DocumentCache, clear, dump_tree, load_tree
+from markdown_to_html import parse_markdown
+
+MARKDOWN = "# Title\n\nSome **bold** and a [link](/a).\n\n- one\n- two\n\n![pic](/p.png)"
+
+
+class TestDocumentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "documents")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _counting_parse(self):
+        calls = []
+
+        def parse(text, terms):
+            calls.append(text)
+            return parse_markdown(text, terms)
+        return parse, calls
+
+    def test_tree_roundtrip(self):
+        node, _ = parse_markdown(MARKDOWN)
+        self.assertEqual(load_tree(dump_tree(node)).to_html(), node.to_html())
+
+    def test_second_parse_is_a_hit(self):
+        cache = DocumentCache(self.cache_dir, 1 << 20)
+        parse, calls = self._counting_parse()
+        terms, cached_terms = {}, {}
+        first, title = cache.parse(MARKDOWN, parse, terms)
+        second, cached_title = DocumentCache(self.cache_dir, 1 << 20).parse(MARKDOWN, parse, cached_terms)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cached_title, second.to_html()), (title, first.to_html()))
+        self.assertEqual(cached_terms, terms)
+        self.assertEqual(terms["bold"], 1)
+
+    def test_parser_version_and_image_sizes_are_part_of_the_key(self):
+        cache = DocumentCache(self.cache_dir, 1 << 20)
+        parse, calls = self._counting_parse()
+        cache.parse(MARKDOWN, parse)
+        with mock.patch.object(doc_cache, "PARSER_VERSION", doc_cache.PARSER_VERSION + 1):
+            cache.parse(MARKDOWN, parse)
+        with mock.patch("image_probe.image_props", return_value={"width": "2", "height": "1"}):
+            node, _ = cache.parse(MARKDOWN, parse)
+        self.assertEqual(len(calls), 3)
+        self.assertIn('width="2"', node.to_html())
+
+    def test_evict_and_clear(self):
+        cache = DocumentCache(self.cache_dir, 0)
+        for i in range(3):
+            cache.parse(f"# Page {i}", parse_markdown)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+        cache.max_bytes = os.path.getsize(os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0]))
+        self.assertEqual(cache.evict(), 2)
+        self.assertEqual(clear(self.cache_dir), 1)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+if __name__ == '__main__':
+    unittest.main()
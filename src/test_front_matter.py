@@ -0,0 +1,95 @@
+import io
+import os
+import tempfile
+import unittest
+
+import front_matter
+from front_matter import parse_front_matter, scan_metadata, split_front_matter
+from markdown_to_html import extract_title, parse_markdown
+
+
+class TestFrontMatter(unittest.TestCase):
+
+    def test_parse_front_matter(self):
+        lines = [
+            'title: "Hello: world"',
+            "date: 2024-05-01",
+            "# a comment",
+            "tags: [python, 'static sites']",
+            "draft: yes",
+            "aliases:",
+            "  - /old",
+            "  - /older",
+            "weight: 3",
+        ]
+        self.assertEqual(
+            parse_front_matter(lines),
+            {
+                "title": "Hello: world",
+                "date": "2024-05-01",
+                "tags": ["python", "static sites"],
+                "draft": True,
+                "aliases": ["/old", "/older"],
+                "weight": 3,
+            },
+        )
+        with self.assertRaises(ValueError):
+            parse_front_matter(["not a key"])
+
+    def test_split_leaves_body_unread(self):
+        stream = io.StringIO("---\ntitle: T\n---\n# Heading\n\nBody\n")
+        metadata, body = split_front_matter(stream)
+        self.assertEqual(metadata, {"title": "T"})
+        self.assertEqual(next(body), "# Heading\n")
+
+    def test_no_or_unclosed_front_matter(self):
+        metadata, body = split_front_matter(["# Title", "text"])
+        self.assertEqual((metadata, list(body)), ({}, ["# Title", "text"]))
+        metadata, body = split_front_matter(["---", "text"])
+        self.assertEqual((metadata, list(body)), ({}, ["---", "text"]))
+
+    def test_extract_title_prefers_front_matter(self):
+        self.assertEqual(extract_title("---\ntitle: Meta\n---\n# Body"), "Meta")
+        self.assertEqual(extract_title("---\ndate: 2024-01-01\n---\n# Body"), "Body")
+
+    def test_scan_metadata_and_drafts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "post.md")
+            with open(path, 'w') as f:
+                f.write("---\ndraft: true\ntags: news\n---\n```\n# not a title\n```\n# Post\n\nBody")
+            metadata = scan_metadata(path)
+            self.assertEqual(metadata["title"], "Post")
+            self.assertEqual(metadata["tags"], ["news"])
+            self.assertTrue(front_matter.is_skipped_draft(path))
+            front_matter.set_include_drafts(True)
+            try:
+                self.assertFalse(front_matter.is_skipped_draft(path))
+            finally:
+                front_matter.set_include_drafts(False)
+
+    def test_scan_metadata_title_follows_the_lexer(self):
+        # A fence line with an info string inside code does not close (or open) it
+        sources = {
+            "```\n```js\n# Not title\n```\n# Real": "Real",
+            "```js\n```\n# Real": "Real",
+            "```\nnever closed\n# Real": "Real",
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "post.md")
+            for source, title in sources.items():
+                with open(path, 'w') as f:
+                    f.write(source)
+                front_matter._scan_cache.clear()
+                self.assertEqual(scan_metadata(path)["title"], title)
+                self.assertEqual(parse_markdown(source)[1], title)
+
+    def test_scan_metadata_error_names_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "post.md")
+            with open(path, 'w') as f:
+                f.write("---\nnot a key\n---\n# Post")
+            with self.assertRaisesRegex(ValueError, "post.md: Invalid front matter line"):
+                front_matter.is_skipped_draft(path)
+
+if __name__ == '__main__':
+    unittest.main()
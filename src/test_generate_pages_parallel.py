@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from generate_pages_parallel import discover_pages, generate_pages_parallel, PageBuildError
+
+
+class TestGeneratePagesParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, rel_path, text):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_discover_pages_is_sorted(self):
+        self._write("b/index.md", "# B")
+        self._write("a.md", "# A")
+        self._write("notes.txt", "ignored")
+        pages = discover_pages(self.content, self.public)
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(self.content, "a.md"), os.path.join(self.public, "a.html")),
+                (os.path.join(self.content, "b", "index.md"), os.path.join(self.public, "b", "index.html")),
+            ],
+        )
+
+    def test_failures_are_aggregated(self):
+        self._write("good.md", "# Good")
+        self._write("bad.md", "no heading")
+        with self.assertRaises(PageBuildError) as ctx:
+            generate_pages_parallel(self.content, self.template, self.public, jobs=2)
+        self.assertEqual([path for path, _ in ctx.exception.failures], [os.path.join(self.content, "bad.md")])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "good.html")))
+
+if __name__ == '__main__':
+    unittest.main()
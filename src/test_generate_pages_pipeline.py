@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from build_manifest import BuildManifest
+from generate_pages_parallel import PageBuildError
+from generate_pages_pipeline import DirectoryCache, generate_pages_pipelined
+from generate_pages_recursive import generate_pages_recursive
+
+
+class TestGeneratePagesPipelined(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, 'w') as f:
+            f.write("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        for i in range(12):
+            section = os.path.join(self.content, f"section{i % 3}")
+            os.makedirs(section, exist_ok=True)
+            with open(os.path.join(section, f"page{i}.md"), 'w') as f:
+                f.write(f"# Page {i}\n\nSome **bold** text and a [link](/page{i}).\n\n* one\n* two")
+
+    def read_tree(self, root):
+        files = {}
+        for dirpath, dirs, names in os.walk(root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                with open(path) as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+    def test_matches_sequential_build(self):
+        sequential = os.path.join(self.tmp.name, "sequential")
+        pipelined = os.path.join(self.tmp.name, "pipelined")
+        generate_pages_recursive(self.content, self.template, sequential)
+        # A small depth makes every stage wait on the next one
+        generate_pages_pipelined(self.content, self.template, pipelined, io_threads=2, depth=2)
+        self.assertEqual(len(self.read_tree(pipelined)), 12)
+        self.assertEqual(self.read_tree(pipelined), self.read_tree(sequential))
+
+    def test_skips_current_pages_and_reports_failures(self):
+        public = os.path.join(self.tmp.name, "public")
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        manifest = BuildManifest(manifest_path, self.template)
+        generate_pages_pipelined(self.content, self.template, public, manifest)
+        manifest.save()
+
+        broken = os.path.join(self.content, "section1", "page4.md")
+        built_from = manifest.pages[broken]["source"]
+        with open(broken, 'w') as f:
+            f.write("no title")
+        manifest = BuildManifest(manifest_path, self.template)
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_pipelined(self.content, self.template, public, manifest)
+        self.assertEqual([path for path, _ in cm.exception.failures], [broken])
+        # The failed page keeps the entry of its last successful build
+        self.assertEqual(manifest.pages[broken]["source"], built_from)
+
+    def test_discovery_error_is_raised_before_stale_removal(self):
+        public = os.path.join(self.tmp.name, "public")
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        manifest = BuildManifest(manifest_path, self.template)
+        generate_pages_pipelined(self.content, self.template, public, manifest)
+        manifest.save()
+
+        with open(os.path.join(self.content, "section0", "page0.md"), 'w') as f:
+            f.write("---\nnot front matter\n---\n# Page 0")
+        manifest = BuildManifest(manifest_path, self.template)
+        with self.assertRaises(ValueError):
+            generate_pages_pipelined(self.content, self.template, public, manifest)
+            manifest.remove_stale(public)
+        self.assertEqual(len(self.read_tree(public)), 12)
+
+    def test_directory_cache_creates_each_directory_once(self):
+        directories = DirectoryCache()
+        path = os.path.join(self.tmp.name, "a", "b")
+        directories.ensure(path)
+        os.rmdir(path)
+        directories.ensure(path)
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
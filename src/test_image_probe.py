@@ -0,0 +1,83 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import image_probe
+from image_probe import probe_dimensions
+from textnode import TextNode, text_node_to_html_node
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x02\0\0\0"
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0\0\0"
+# SOI, an APP0 segment to skip, then a baseline SOF0 frame header
+JPEG = (
+    b"\xff\xd8"
+    + b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+    + b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 300, 400) + b"\x01\x01\x11\x00"
+)
+
+
+class TestImageProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(image_probe.disable)
+        self.static_dir = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.static_dir, "images"))
+        self.cache_path = os.path.join(self.tmp.name, "cache", "images.json")
+
+    def write(self, name, data):
+        path = os.path.join(self.static_dir, "images", name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_probe_formats(self):
+        self.assertEqual(probe_dimensions(self.write("a.png", PNG)), (640, 480))
+        self.assertEqual(probe_dimensions(self.write("a.gif", GIF)), (32, 16))
+        self.assertEqual(probe_dimensions(self.write("a.jpg", JPEG)), (400, 300))
+        self.assertIsNone(probe_dimensions(self.write("a.txt", b"not an image")))
+
+    def test_img_gets_size_and_loading_hints(self):
+        self.write("a.png", PNG)
+        image_probe.enable(self.static_dir, self.cache_path)
+        node = text_node_to_html_node(TextNode("alt", "image", "/images/a.png"))
+        self.assertEqual(
+            node.to_html(),
+            '<img src="/images/a.png" alt="alt" width="640" height="480" loading="lazy" decoding="async"></img>',
+        )
+        remote = text_node_to_html_node(TextNode("alt", "image", "https://example.com/a.png"))
+        self.assertNotIn("width", remote.props)
+        self.assertEqual(remote.props["loading"], "lazy")
+
+    def test_cache_skips_unchanged_images(self):
+        self.write("a.png", PNG)
+        image_probe.enable(self.static_dir, self.cache_path)
+        image_probe.image_props("/images/a.png")
+        image_probe.save()
+
+        image_probe.enable(self.static_dir, self.cache_path)
+        with mock.patch("image_probe.probe_dimensions") as probe:
+            props = image_probe.image_props("/images/a.png")
+        probe.assert_not_called()
+        self.assertEqual((props["width"], props["height"]), ("640", "480"))
+
+        # A new mtime means the image is probed again
+        path = self.write("a.png", PNG)
+        os.utime(path, ns=(0, 1))
+        with mock.patch("image_probe.probe_dimensions", return_value=(1, 2)) as probe:
+            props = image_probe.image_props("/images/a.png")
+        probe.assert_called_once()
+        self.assertEqual((props["width"], props["height"]), ("1", "2"))
+
+    def test_unreadable_cache_is_ignored(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        for text in ('{"version": 1, "ima', '[]', '{"version": -1, "images": {}}'):
+            with open(self.cache_path, 'w') as f:
+                f.write(text)
+            self.assertEqual(image_probe.ImageSizes(self.static_dir, self.cache_path).entries, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import inline_cache
+from inline_cache import InlineCache
+from markdown_to_html import markdown_to_html_node
+
+
+class TestInlineCache(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = InlineCache(1000)
+        calls = []
+        render = lambda text: calls.append(text) or text.upper()
+        self.assertEqual(cache.get_or_render("a", render), "A")
+        self.assertEqual(cache.get_or_render("a", render), "A")
+        self.assertEqual(calls, ["a"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = InlineCache(8)
+        render = lambda text: text
+        cache.get_or_render("aa", render)
+        cache.get_or_render("bb", render)
+        cache.get_or_render("aa", render)  # "bb" is now the oldest
+        cache.get_or_render("cc", render)
+        self.assertEqual(list(cache.entries), ["aa", "cc"])
+        self.assertLessEqual(cache.size, 8)
+
+    def test_cached_build_renders_the_same_html(self):
+        markdown = "# Title\n\nSame **text** and [a link](/x)\n\nSame **text** and [a link](/x)\n\n* Same **text** and [a link](/x)"
+        expected = markdown_to_html_node(markdown).to_html()
+        inline_cache.enable(1 << 20)
+        try:
+            self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+            stats = inline_cache.stats()
+            self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        finally:
+            inline_cache.disable()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import minify
+from markdown_to_html import markdown_to_html_node
+from minify import minify_css, minify_html, minify_tree
+from template import load_template
+
+
+class TestMinify(unittest.TestCase):
+
+    def test_minify_html(self):
+        html = (
+            "<!DOCTYPE html>\n<html>\n<head>\n    <title> {{ Title }} </title>\n</head>\n"
+            "<!-- a comment -->\n<body>\n    <p>Some   <b>bold</b>\n text</p>\n"
+            "    <pre>keep\n    this</pre>\n</body>\n</html>\n"
+        )
+        self.assertEqual(
+            minify_html(html),
+            "<!DOCTYPE html><html><head><title>{{ Title }}</title></head>"
+            "<body><p>Some <b>bold</b> text</p><pre>keep\n    this</pre></body></html>",
+        )
+
+    def test_minify_tree_keeps_code(self):
+        node = markdown_to_html_node("# Title\n\nOne\n  two `a   b`\n\n```\nx  =  1\n  y\n```")
+        self.assertEqual(
+            minify_tree(node).to_html(),
+            "<div><h1>Title</h1><p>One two <code>a   b</code></p><pre><code>x  =  1\n  y\n</code></pre></div>",
+        )
+
+    def test_minify_css(self):
+        css = "/* header */\na :hover,\nb > i {\n    content: \"a  ;  b\";\n    margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), 'a :hover,b>i{content:"a  ;  b";margin:0 auto}')
+
+    def test_template_is_minified_and_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, 'w') as f:
+                f.write("<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+            cache_dir = os.path.join(tmp, "cache")
+            minify.enable(cache_dir)
+            try:
+                template = load_template(template_path)
+                self.assertEqual(template.render({"Content": "x"}), "<html><body>x</body></html>")
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+            finally:
+                minify.disable()
+            self.assertIn("\n", load_template(template_path).render({"Content": "x"}))
+
+if __name__ == '__main__':
+    unittest.main()
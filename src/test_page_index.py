@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from page_index import PageIndex, page_urls, resolve_url, scan_page
+
+
+class TestPageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.index_path = os.path.join(self.tmp.name, "pages.json")
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.content, rel_path)
+        with open(path, 'w') as f:
+            f.write(text)
+        dest = os.path.join(self.public, rel_path[:-3] + ".html")
+        return path, dest
+
+    def test_scan_page_skips_code(self):
+        src, _ = self.write("index.md", "# Home\n\n[blog](/blog) ![logo](/logo.png)\n\n```\n[not](/a-link)\n```")
+        self.assertEqual(
+            scan_page(src),
+            {"title": "Home", "date": None, "tags": [], "links": ["/blog"], "images": ["/logo.png"]},
+        )
+
+    def test_resolve_url(self):
+        self.assertEqual(resolve_url("../about#team", "/blog/post.html"), "/about")
+        self.assertEqual(resolve_url("/blog/", "/index.html"), "/blog/")
+        self.assertIsNone(resolve_url("https://example.com", "/index.html"))
+        self.assertIsNone(resolve_url("#top", "/index.html"))
+        self.assertEqual(page_urls("blog/index.html"), ["/blog/index.html", "/blog/", "/blog"])
+
+    def test_broken_links_are_rechecked_when_targets_change(self):
+        home = self.write("index.md", "# Home\n\n[post](/blog/post) [gone](/missing) ![logo](/logo.png)")
+        post = self.write("blog/post.md", "# Post\n\n[home](../index.html)")
+        index = PageIndex(self.index_path)
+        index.update([home, post], self.public)
+        self.assertEqual(
+            index.check_links(["/logo.png"]),
+            [(home[0], "/missing")],
+        )
+        index.save()
+
+        # Removing the post only rechecks the page that links to it
+        index = PageIndex(self.index_path)
+        index.update([home], self.public)
+        self.assertEqual(
+            index.check_links(["/logo.png"]),
+            [(home[0], "/blog/post"), (home[0], "/missing")],
+        )
+
+if __name__ == '__main__':
+    unittest.main()
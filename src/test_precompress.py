@@ -0,0 +1,89 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import precompress
+from precompress import compress_file
+
+
+class TestPrecompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_writes_deterministic_gz(self):
+        data = b"<p>" + b"hello world " * 200 + b"</p>"
+        path = self.write("index.html", data)
+        self.assertTrue(compress_file(path, 9))
+        with open(path + ".gz", 'rb') as f:
+            first = f.read()
+        self.assertEqual(gzip.decompress(first), data)
+        # An identical .gz is left alone and not counted as written
+        self.assertFalse(compress_file(path, 9))
+        with open(path + ".gz", 'rb') as f:
+            self.assertEqual(f.read(), first)
+
+    def test_skips_and_removes_gz_when_not_smaller(self):
+        path = self.write("tiny.css", b"a{}")
+        self.write("tiny.css.gz", b"outdated")
+        self.assertFalse(compress_file(path, 9))
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+    def test_submit_only_compresses_text_assets_when_enabled(self):
+        page = self.write("page.html", b"<p>text</p>" * 100)
+        image = self.write("image.png", b"\0" * 1000)
+        precompress.submit(page)
+        self.assertEqual(precompress.finish(), 0)
+
+        precompress.enable(6, 2)
+        precompress.submit(page)
+        precompress.submit(image)
+        self.assertEqual(precompress.finish(), 1)
+        self.assertTrue(os.path.exists(page + ".gz"))
+        self.assertFalse(os.path.exists(image + ".gz"))
+
+        precompress.enable(6, 2)
+        precompress.submit(page)
+        self.assertEqual(precompress.finish(), 0)
+
+    def test_submit_if_outdated(self):
+        page = self.write("page.html", b"<p>text</p>" * 100)
+        precompress.enable(6, 2)
+        precompress.submit_if_outdated(page)
+        self.assertEqual(precompress.finish(), 1)
+
+        # A current .gz is left alone; one older than its file is redone
+        precompress.enable(6, 2)
+        precompress.submit_if_outdated(page)
+        self.assertEqual(precompress.finish(), 0)
+        self.write("page.html", b"<p>new</p>" * 100)
+        os.utime(page + ".gz", ns=(0, 0))
+        precompress.enable(6, 2)
+        precompress.submit_if_outdated(page)
+        self.assertEqual(precompress.finish(), 1)
+        with open(page + ".gz", 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), b"<p>new</p>" * 100)
+
+        # An identical but older .gz is touched so it is not redone every build
+        os.utime(page + ".gz", ns=(0, 0))
+        precompress.enable(6, 2)
+        precompress.submit_if_outdated(page)
+        self.assertEqual(precompress.finish(), 0)
+        self.assertGreaterEqual(os.stat(page + ".gz").st_mtime_ns, os.stat(page).st_mtime_ns)
+
+        # While compression is off, an outdated .gz is dropped and a missing one is fine
+        os.utime(page + ".gz", ns=(0, 0))
+        precompress.submit_if_outdated(page)
+        self.assertFalse(os.path.exists(page + ".gz"))
+        precompress.submit_if_outdated(page)
+
+if __name__ == '__main__':
+    unittest.main()
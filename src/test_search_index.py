@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import inline_cache
+import search_index
+import site_archive
+from markdown_to_html import parse_markdown
+from page_index import PageIndex
+from search_index import SearchIndex, page_terms, shard_name
+
+PAGE = "# The Hobbit\n\n* **Bilbo** and [Gandalf](/g)\n\n```\nignored code\n```"
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(self.content)
+        self.state_path = os.path.join(self.tmp.name, "search.json")
+        self.index_path = os.path.join(self.tmp.name, "pages.json")
+
+    def write(self, name, text):
+        path = os.path.join(self.content, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path, os.path.join(self.public, name[:-3] + ".html")
+
+    def build(self, pages):
+        index = PageIndex(self.index_path)
+        index.update(pages, self.public)
+        index.save()
+        search = SearchIndex(self.state_path)
+        search.update(index, self.public)
+        search.save()
+
+    def read_shard(self, prefix):
+        with open(os.path.join(self.public, "search", shard_name(prefix))) as f:
+            return json.load(f)
+
+    def test_page_terms(self):
+        src, _ = self.write("a.md", PAGE)
+        self.assertEqual(page_terms(src), {"the": 1, "hobbit": 1, "bilbo": 1, "and": 1, "gandalf": 1})
+
+    def test_terms_counted_while_parsing(self):
+        src, _ = self.write("a.md", PAGE)
+        terms = {}
+        parse_markdown(PAGE, terms)
+        self.assertEqual(terms, page_terms(src))
+        inline_cache.enable(1 << 20)
+        try:
+            for _ in range(2):
+                cached_terms = {}
+                parse_markdown(PAGE, cached_terms)
+                self.assertEqual(cached_terms, terms)
+        finally:
+            inline_cache.disable()
+
+    def test_rendered_pages_are_not_read_again(self):
+        page = self.write("a.md", "# Page")
+        search_index.record_terms(page[0], {"rendered": 1})
+        self.build([page])
+        self.assertEqual(self.read_shard("re"), {"rendered": [[0, 1]]})
+
+    def test_shards_and_incremental_update(self):
+        home = self.write("index.md", "# Home\n\nHobbits live here")
+        post = self.write("post.md", "# Post\n\nHobbits travel")
+        self.build([home, post])
+
+        with open(os.path.join(self.public, "search", "meta.json")) as f:
+            meta = json.load(f)
+        self.assertEqual(meta["docs"], [["/", "Home"], ["/post.html", "Post"]])
+        self.assertEqual(self.read_shard("ho")["hobbits"], [[0, 1], [1, 1]])
+
+        # Only the shards holding the changed page's old and new terms are rewritten
+        tr_path = os.path.join(self.public, "search", "tr.json")
+        os.utime(tr_path, ns=(0, 0))
+        self.write("index.md", "# Home\n\nHobbits sleep here")
+        self.build([home, post])
+        self.assertEqual(os.stat(tr_path).st_mtime_ns, 0)
+        self.assertEqual(self.read_shard("sl"), {"sleep": [[0, 1]]})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "li.json")))
+
+        # Removed pages drop out of the postings
+        self.build([home])
+        self.assertEqual(self.read_shard("ho")["hobbits"], [[0, 1]])
+
+    def test_only_written_files_are_compressed(self):
+        home = self.write("index.md", "# Home\n\nHobbits live here")
+        self.build([home])
+        for name in os.listdir(os.path.join(self.public, "search")):
+            open(os.path.join(self.public, "search", name + ".gz"), 'w').close()
+        self.write("index.md", "# Home\n\nHobbits sleep here")
+        with mock.patch("precompress.submit") as submit:
+            self.build([home])
+        self.assertEqual(
+            sorted(os.path.basename(call.args[0]) for call in submit.call_args_list),
+            ["meta.json", "sl.json"],
+        )
+
+    def test_archive_build_leaves_public_alone(self):
+        home = self.write("index.md", "# Home\n\nHobbits live here")
+        self.build([home])
+        self.write("index.md", "# Home\n\nHobbits sleep here")
+        site_archive.open_archive(os.path.join(self.tmp.name, "site.tar"), self.public)
+        try:
+            self.build([home])
+        finally:
+            site_archive.close_archive(success=False)
+        # The emptied shard is only left out of the archive
+        self.assertTrue(os.path.exists(os.path.join(self.public, "search", "li.json")))
+
+    def test_fresh_index_ignores_saved_ids(self):
+        first = self.write("a.md", "# A")
+        second = self.write("b.md", "# B")
+        self.build([first, second])
+        # The saved state hands page c the id page a freed
+        third = self.write("c.md", "# C")
+        self.build([second, third])
+        with open(os.path.join(self.public, "search", "meta.json")) as f:
+            self.assertEqual(json.load(f)["docs"], [["/c.html", "C"], ["/b.html", "B"]])
+
+        index = PageIndex(self.index_path)
+        index.update([second, third], self.public)
+        SearchIndex(None).update(index, self.public)
+        with open(os.path.join(self.public, "search", "meta.json")) as f:
+            self.assertEqual(json.load(f)["docs"], [["/b.html", "B"], ["/c.html", "C"]])
+
+if __name__ == '__main__':
+    unittest.main()
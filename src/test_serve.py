@@ -0,0 +1,106 @@
+import os
+import struct
+import tempfile
+import threading
+import unittest
+
+import image_probe
+from serve import ReloadNotifier, _snapshot_sources, diff_snapshots, rebuild
+
+
+class TestServe(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.static, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def page(self, rel_path, text="# Page"):
+        return self.write(os.path.join(self.content, rel_path), text)
+
+    def output(self, rel_path):
+        return os.path.join(self.public, rel_path)
+
+    def rebuild(self, changed=(), removed=()):
+        rebuild(list(changed), list(removed), self.content, self.static, self.public, self.template)
+
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), (["b", "d"], ["c"]))
+
+    def test_snapshot_sources_skips_ignored_directories(self):
+        page = self.page("blog/post.md")
+        self.page(".git/objects/ab")
+        css = self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.assertEqual(sorted(_snapshot_sources(self.content, self.static)), sorted([page, css, self.template]))
+
+    def test_rebuild_pages_and_static_files(self):
+        page = self.page("blog/post.md")
+        css = self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.rebuild(changed=[page, css])
+        with open(self.output("blog/post.html")) as f:
+            self.assertEqual(f.read(), "<title>Page</title><main><div><h1>Page</h1></div></main>")
+        self.assertTrue(os.path.exists(self.output("index.css")))
+
+        os.remove(page)
+        os.remove(css)
+        self.rebuild(removed=[page, css])
+        self.assertEqual(os.listdir(self.public), [])
+
+    def test_rebuild_skips_ignored_files_and_drafts(self):
+        lock_file = self.page("blog/.#post.md")
+        hidden = self.page(".drafts/idea.md")
+        draft = self.page("draft.md", "---\ndraft: true\n---\n# Draft")
+        self.rebuild(changed=[lock_file, hidden, draft])
+        self.assertFalse(os.path.exists(self.public))
+
+        # A published page that becomes a draft is taken down
+        post = self.page("post.md")
+        self.rebuild(changed=[post])
+        self.page("post.md", "---\ndraft: true\n---\n# Page")
+        self.rebuild(changed=[post])
+        self.assertFalse(os.path.exists(self.output("post.html")))
+
+    def test_rebuild_pages_showing_a_changed_image(self):
+        image = os.path.join(self.static, "images", "a.png")
+
+        def write_png(width, height):
+            os.makedirs(os.path.dirname(image), exist_ok=True)
+            with open(image, 'wb') as f:
+                f.write(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height))
+            os.utime(image, ns=(0, width))
+
+        image_probe.enable(self.static, os.path.join(self.tmp.name, "images.json"))
+        self.addCleanup(image_probe.disable)
+        write_png(1344, 896)
+        shows = self.page("shows.md", "# Shows\n\n![a](/images/a.png)")
+        other = self.page("other.md")
+        self.rebuild(changed=[shows, other, image])
+
+        write_png(10, 20)
+        os.utime(self.output("other.html"), ns=(0, 0))
+        self.rebuild(changed=[image])
+        with open(self.output("shows.html")) as f:
+            self.assertIn('width="10" height="20"', f.read())
+        self.assertEqual(os.stat(self.output("other.html")).st_mtime_ns, 0)
+
+    def test_reload_notifier(self):
+        notifier = ReloadNotifier()
+        self.assertEqual(notifier.wait(0, timeout=0), 0)
+        threading.Timer(0.01, notifier.notify).start()
+        self.assertEqual(notifier.wait(0, timeout=5), 1)
+        self.assertEqual(notifier.version, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+
+import sharding
+from build_manifest import hash_file
+from sharding import ShardMergeError, merge_shards, parse_shard, shard_of
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        sharding.set_shard(None)
+
+    def _shard(self, name, index, count, files):
+        # Writes a shard's output directory and its manifest
+        shard_dir = os.path.join(self.root, name)
+        listing = {}
+        for rel_path, text in files.items():
+            path = os.path.join(shard_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(text)
+            listing[rel_path] = [hash_file(path), len(text), 0]
+        with open(os.path.join(shard_dir, sharding.SHARD_MANIFEST), 'w') as f:
+            json.dump({"version": sharding.SHARD_MANIFEST_VERSION, "shard": [index, count], "files": listing}, f)
+        return shard_dir
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "4", "a/b", "1/0"):
+            with self.assertRaises(ValueError, msg=text):
+                parse_shard(text)
+
+    def test_every_page_is_in_exactly_one_shard(self):
+        paths = [f"content/blog/post{i}.md" for i in range(200)]
+        shards = {}
+        for index in (1, 2, 3):
+            sharding.set_shard((index, 3))
+            shards[index] = [path for path in paths if sharding.includes(path)]
+        self.assertEqual(sorted(sum(shards.values(), [])), sorted(paths))
+        self.assertTrue(all(shards.values()))
+        self.assertEqual(shard_of("content/index.md", 3), shard_of("content/index.md", 3))
+
+    def test_merge(self):
+        first = self._shard("s1", 1, 2, {"index.html": "a", "index.css": "css"})
+        second = self._shard("s2", 2, 2, {"blog/index.html": "b", "index.css": "css"})
+        output = os.path.join(self.root, "public")
+        os.makedirs(output)
+        with open(os.path.join(output, "old.html"), 'w') as f:
+            f.write("stale")
+        self.assertEqual(merge_shards([second, first], output), 3)
+        self.assertEqual(
+            sorted(os.path.relpath(os.path.join(d, n), output) for d, _, names in os.walk(output) for n in names),
+            ["blog/index.html", "index.css", "index.html"],
+        )
+
+    def test_merge_problems(self):
+        first = self._shard("s1", 1, 3, {"index.css": "css"})
+        second = self._shard("s2", 2, 3, {"index.css": "other", "a.html": "a"})
+        with open(os.path.join(second, "a.html"), 'w') as f:
+            f.write("edited")
+        output = os.path.join(self.root, "public")
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards([first, second], output)
+        problems = "\n".join(cm.exception.problems)
+        self.assertIn("Missing shard 3/3", problems)
+        self.assertIn("Conflict: index.css", problems)
+        self.assertIn("does not match its shard manifest", problems)
+        self.assertFalse(os.path.exists(output))
+
+if __name__ == '__main__':
+    unittest.main()
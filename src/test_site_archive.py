@@ -0,0 +1,114 @@
+import contextlib
+import gc
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import site_archive
+from generate_pages_parallel import generate_pages_parallel
+from generate_pages_pipeline import generate_pages_pipelined
+from generate_pages_recursive import generate_pages_recursive
+from site_archive import SiteArchive, archive_format
+
+
+class TestSiteArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.asset = os.path.join(self.root, "logo.png")
+        with open(self.asset, 'wb') as f:
+            f.write(b"\x89PNG" * 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, name):
+        path = os.path.join(self.root, name)
+        archive = SiteArchive(path, "public")
+        archive.write_text(os.path.join("public", "index.html"), "<h1>Hi</h1>")
+        archive.write_file(os.path.join("public", "images", "logo.png"), self.asset)
+        archive.close()
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_archive_format(self):
+        self.assertEqual(archive_format("site.tgz"), "tar.gz")
+        self.assertEqual(archive_format("out/site.zip"), "zip")
+        with self.assertRaises(ValueError):
+            archive_format("site.rar")
+
+    def test_archives_are_reproducible(self):
+        for name in ("site.tar", "site.tar.gz", "site.zip"):
+            first = self._build(name)
+            self.assertEqual(self._build(name), first, name)
+
+    def test_entries(self):
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+            self._build("site.tar.gz")
+            self._build("site.zip")
+        with tarfile.open(os.path.join(self.root, "site.tar.gz")) as tar:
+            members = tar.getmembers()
+            self.assertEqual([m.name for m in members], ["index.html", "images/logo.png"])
+            self.assertEqual({(m.mtime, m.mode, m.uid) for m in members}, {(1700000000, 0o644, 0)})
+            self.assertEqual(tar.extractfile("index.html").read(), b"<h1>Hi</h1>")
+        with zipfile.ZipFile(os.path.join(self.root, "site.zip")) as zf:
+            self.assertEqual(zf.namelist(), ["index.html", "images/logo.png"])
+            self.assertEqual(zf.read("images/logo.png"), b"\x89PNG" * 100)
+
+    def test_duplicate_entry_and_abort(self):
+        path = os.path.join(self.root, "site.tar")
+        archive = SiteArchive(path, "public")
+        archive.write_text("public/index.html", "a")
+        with self.assertRaises(ValueError):
+            archive.write_text("public/index.html", "b")
+        archive.abort()
+        self.assertEqual(os.listdir(self.root), ["logo.png"])
+
+    def test_abort_leaves_nothing_to_flush(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            for name in ("site.tar", "site.tar.gz", "site.zip"):
+                archive = SiteArchive(os.path.join(self.root, name), "public")
+                archive.write_text("public/index.html", "a")
+                archive.abort()
+                del archive
+                gc.collect()
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertEqual(os.listdir(self.root), ["logo.png"])
+
+    def test_build_modes_give_identical_archives(self):
+        content = os.path.join(self.root, "content")
+        template = os.path.join(self.root, "template.html")
+        for rel_path in ("index.md", "blog/index.md", "blog/post.md", "zz.md"):
+            path = os.path.join(content, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(f"# {rel_path}")
+        with open(template, 'w') as f:
+            f.write("{{ Title }}{{ Content }}")
+
+        builds = {
+            "-j 1": lambda: generate_pages_recursive(content, template, "public"),
+            "-j 2": lambda: generate_pages_parallel(content, template, "public", 2),
+            "--pipeline": lambda: generate_pages_pipelined(content, template, "public"),
+        }
+        archives = {}
+        for name, build in builds.items():
+            path = os.path.join(self.root, "site.tar")
+            site_archive.open_archive(path, "public")
+            try:
+                build()
+            finally:
+                site_archive.close_archive()
+            with open(path, 'rb') as f:
+                archives[name] = f.read()
+        self.assertEqual(archives["-j 2"], archives["-j 1"])
+        self.assertEqual(archives["--pipeline"], archives["-j 1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from template import Template, TemplateError, load_template, template_hash
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render({"Title": "Home", "Content": "<p>Hi</p>"}),
+            "<title> Home </title><body><p>Hi</p></body>",
+        )
+
+    def test_placeholders_in_content_are_not_substituted(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        html = template.render({"Title": "Docs", "Content": "<code>{{ Title }}</code>"})
+        self.assertEqual(html, "<title>Docs</title><code>{{ Title }}</code>")
+
+    def test_no_placeholders(self):
+        template = Template("<html></html>")
+        self.assertEqual(template.render({}), "<html></html>")
+
+    def test_unknown_placeholders_are_text(self):
+        source = '<div id="app">{{ user }} {{Description}} {{ Titles }}</div>{{ Content }}'
+        template = Template(source)
+        self.assertEqual(template.slots, ["Content"])
+        self.assertEqual(template.render({"Content": "x"}), source.replace("{{ Content }}", "x"))
+
+    def test_missing_value(self):
+        template = Template("{{ Title }}")
+        with self.assertRaises(KeyError):
+            template.render({})
+
+    def test_layout_blocks(self):
+        sources = {"base": "<title>{{ block title }}Site{{ endblock }}</title><main>{{ block main }}{{ endblock }}</main>"}
+        template = Template(
+            "{{ extends base }}\n{{ block main }}<p>{{ Content }}</p>{{ endblock }}",
+            sources.__getitem__,
+        )
+        self.assertEqual(template.render({"Content": "Hi"}), "<title>Site</title><main><p>Hi</p></main>")
+
+    def test_nested_layouts_and_partials(self):
+        sources = {
+            "base": "{{> header }}[{{ block body }}{{ block inner }}base{{ endblock }}{{ endblock }}]",
+            "page": "{{ extends base }}{{ block inner }}page {{ Title }}{{ endblock }}",
+            "header": "<h1>{{ Title }}</h1>",
+        }
+        page = Template(sources["page"], sources.__getitem__)
+        self.assertEqual(page.render({"Title": "T"}), "<h1>T</h1>[page T]")
+        # The most derived definition of a block wins
+        template = Template("{{ extends page }}{{ block body }}<{{ Title }}>{{ endblock }}", sources.__getitem__)
+        self.assertEqual(template.render({"Title": "T"}), "<h1>T</h1>[<T>]")
+        self.assertEqual(template.slots, ["Title", "Title"])
+
+    def test_invalid_templates(self):
+        sources = {"loop": "{{> loop }}"}
+        for source in (
+            "{{ block a }}",
+            "{{ endblock }}",
+            "<p></p>{{ extends base }}",
+            "{{> loop }}",
+            "{{ extends missing }}",
+        ):
+            with self.assertRaises((TemplateError, KeyError), msg=source):
+                Template(source, sources.__getitem__)
+        with self.assertRaises(TemplateError):
+            Template("{{> header }}")
+
+    def test_errors_name_the_template(self):
+        sources = {"base": "{{ block main }}", "footer": "{{ endblock }}"}
+        with self.assertRaisesRegex(TemplateError, "^base: Unclosed block: main"):
+            Template("{{ extends base }}", sources.__getitem__, "page.html")
+        with self.assertRaisesRegex(TemplateError, "^footer: "):
+            Template("{{> footer }}", sources.__getitem__, "page.html")
+        with self.assertRaisesRegex(TemplateError, "^page.html: "):
+            Template("<p></p>{{ extends base }}", sources.__getitem__, "page.html")
+
+    def test_unknown_placeholders_in_partials_are_text(self):
+        sources = {"widget": "<script>{{ count }}</script>{{ Title }}"}
+        template = Template("{{> widget }}", sources.__getitem__)
+        self.assertEqual(template.render({"Title": "T"}), "<script>{{ count }}</script>T")
+
+    def test_load_template_tracks_partials(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            def write(name, text):
+                with open(os.path.join(tmp, name), 'w') as f:
+                    f.write(text)
+
+            write("template.html", "{{> header }}{{ Content }}")
+            write("header.html", "<h1>")
+            path = os.path.join(tmp, "template.html")
+            self.assertEqual(load_template(path).render({"Content": "x"}), "<h1>x")
+            digest = template_hash(path)
+            self.assertEqual(template_hash(path), digest)
+            write("header.html", "<header>")
+            self.assertEqual(load_template(path).render({"Content": "x"}), "<header>x")
+            self.assertNotEqual(template_hash(path), digest)
+
+if __name__ == '__main__':
+    unittest.main()
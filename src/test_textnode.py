@@ -246,5 +246,46 @@ def test_paragraph(self):
     block = "This is a normal paragraph."
     self.assertEqual(block_to_block_type(block), "paragraph")
 
+class TestTextToTextnodesCompat(unittest.TestCase):
+    """
+    The single-pass text_to_textnodes must match the original five-pass pipeline.
+    """
+
+    @staticmethod
+    def reference(text):
+        nodes = [TextNode(text, "text")]
+        nodes = split_nodes_image(nodes)
+        nodes = split_nodes_link(nodes)
+        nodes = split_nodes_delimiter(nodes, "**", "bold")
+        nodes = split_nodes_delimiter(nodes, "*", "italic")
+        nodes = split_nodes_delimiter(nodes, "`", "code")
+        return nodes
+
+    cases = [
+        "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+        "Just plain text",
+        "",
+        "This is text with a `code block` word",
+        "Normal **bold** text",
+        "This is *italic* text",
+        "Text with **bold** and `code`",
+        "Here is an image ![cat](https://example.com/cat.jpg) and more text.",
+        "This is a link [to Google](https://www.google.com) and more text.",
+        "**bold**",
+        "a **unclosed",
+        "***both***",
+        "*a `b` c* and `d *e* f`",
+        "**a *b* `c`** tail*",
+        "`x` **y",
+        "[x![c](d)](e) and [a](x![y)](z)",
+        "![a](b)![c](d)[e](f)",
+        "*" * 7 + "`" * 3,
+    ]
+
+    def test_matches_reference(self):
+        for text in self.cases:
+            with self.subTest(text=text):
+                self.assertEqual(text_to_textnodes(text), self.reference(text))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
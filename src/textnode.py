@@ -1,7 +1,17 @@
 from HTMLNode import LeafNode
+import image_probe
+# Block splitting lives in block_lexer; re-exported here for existing callers
+from block_lexer import markdown_to_blocks, block_to_block_type
 import re
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Same as (?<!!)\[...; the lookbehind sits after the literal "[" so the regex
+# engine can skip ahead to candidate brackets instead of trying every position
+LINK_PATTERN = re.compile(r"\[(?<!!\[)([^\[\]]*)\]\(([^\(\)]*)\)")
+
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__ (self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -18,29 +28,33 @@ class TextNode:
         return f"TextNode({self.text},{self.text_type},{self.url})"
     
 
+# Text types that map to a plain tag with no props
+_SIMPLE_TAGS = {
+    "text": None,  # Raw text node (no tag)
+    "bold": "b",
+    "italic": "i",
+    "code": "code",
+}
+
 def text_node_to_html_node(text_node):
+    text_type = text_node.text_type
 
-    if text_node.text_type == "text":
-        return LeafNode(value=text_node.text)  # Raw text node (no tag)
-    
-    elif text_node.text_type == "bold":
-        return LeafNode(tag="b", value=text_node.text)
+    if text_type in _SIMPLE_TAGS:
+        # No props dict is built; the leaf shares the read-only empty props
+        return LeafNode(_SIMPLE_TAGS[text_type], text_node.text)
     
-    elif text_node.text_type == "italic":
-        return LeafNode(tag="i", value=text_node.text)
-    
-    elif text_node.text_type == "code":
-        return LeafNode(tag="code", value=text_node.text)
-    
-    elif text_node.text_type == "link":
+    elif text_type == "link":
         if not text_node.url:
             raise ValueError("Link TextNode must have a URL.")
         return LeafNode(tag="a", value=text_node.text, props={"href": text_node.url})
     
-    elif text_node.text_type == "image":
+    elif text_type == "image":
         if not text_node.url:
             raise ValueError("Image TextNode must have a URL.")
-        return LeafNode(tag="img", value="", props={"src": text_node.url, "alt": text_node.text})
+        props = {"src": text_node.url, "alt": text_node.text}
+        # Intrinsic size and lazy loading, when the build has image probing on
+        props.update(image_probe.image_props(text_node.url))
+        return LeafNode(tag="img", value="", props=props)
     
     else:
         raise ValueError(f"Unknown TextNode type: {text_node.text_type}")
@@ -86,9 +100,7 @@ def extract_markdown_images(text):
     :param text: A string containing markdown text.
     :return: A list of tuples where each tuple contains (alt_text, image_url).
     """
-    image_pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(image_pattern, text)
-    return matches
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
     """
@@ -96,9 +108,19 @@ def extract_markdown_links(text):
     :param text: A string containing markdown text.
     :return: A list of tuples where each tuple contains (anchor_text, url).
     """
-    link_pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(link_pattern, text)
-    return matches
+    return LINK_PATTERN.findall(text)
+
+def image_attributes(text):
+    """
+    The image attributes that rendering markdown adds beyond its text: image_props()
+    of every image it shows, so caches of rendered pages can tell when one changed.
+    :param text: A markdown string.
+    :return: A sorted list of (image_url, props) tuples.
+    """
+    return sorted(
+        (url, image_probe.image_props(url))
+        for url in {url for _, url in extract_markdown_images(text)}
+    )
 
 def split_nodes_image(old_nodes):
     """
@@ -196,74 +218,116 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
-def text_to_textnodes(text):
+def _tokenize_delimiters(text, nodes):
     """
-    Converts markdown text into a list of TextNode objects based on formatting such as bold, italic, code, images, and links.
-    :param text: A string containing markdown text.
-    :return: A list of TextNode objects.
+    Emits the bold/italic/code nodes for a run of text in one left-to-right scan.
+    Reproduces splitting on "**", then "*", then "`": a part between delimiters is
+    dropped when empty, except the last part of each split, which is always kept.
     """
-    # Start with the entire text as a single text node
-    nodes = [TextNode(text, "text")]
-
-    # Process images first
-    nodes = split_nodes_image(nodes)
-
-    # Process links
-    nodes = split_nodes_link(nodes)
-
-    # Process bold text (using ** for bold)
-    nodes = split_nodes_delimiter(nodes, "**", "bold")
-
-    # Process italic text (using * for italic)
-    nodes = split_nodes_delimiter(nodes, "*", "italic")
-
-    # Process code blocks (using ` for code)
-    nodes = split_nodes_delimiter(nodes, "`", "code")
+    # Next unprocessed "*" and "`"; each is searched for at C speed and only
+    # moves forward, so the whole run is scanned once per delimiter character.
+    star = text.find("*")
+    tick = text.find("`")
+    if star < 0 and tick < 0:
+        nodes.append(TextNode(text, "text"))
+        return
+
+    bold = italic = code = False
+    part_start = 0     # Start of the current "**" part
+    italic_start = 0   # Start of the current "*" part (outside bold)
+    code_start = 0     # Start of the current "`" part (outside bold and italic)
+
+    while star >= 0 or tick >= 0:
+        if tick < 0 or 0 <= star < tick:
+            idx = star
+            # "**" wins over "*", matching str.split("**") running first
+            delimiter = "**" if text.startswith("*", idx + 1) else "*"
+            end = idx + len(delimiter)
+            star = text.find("*", end)
+        else:
+            idx = tick
+            delimiter = "`"
+            end = idx + 1
+            tick = text.find("`", end)
+
+        if delimiter == "**":
+            if bold:
+                if idx > part_start:
+                    nodes.append(TextNode(text[part_start:idx], "bold"))
+            elif idx > part_start:
+                # The last "*" and "`" parts of a non-empty text part are always kept
+                if italic:
+                    nodes.append(TextNode(text[italic_start:idx], "italic"))
+                else:
+                    nodes.append(TextNode(text[code_start:idx], "code" if code else "text"))
+            bold = not bold
+            italic = code = False
+            part_start = italic_start = code_start = end
+
+        elif bold:
+            pass
+
+        elif delimiter == "*":
+            if italic:
+                if idx > italic_start:
+                    nodes.append(TextNode(text[italic_start:idx], "italic"))
+            elif idx > italic_start:
+                nodes.append(TextNode(text[code_start:idx], "code" if code else "text"))
+            italic = not italic
+            code = False
+            italic_start = code_start = end
+
+        elif not italic:
+            if idx > code_start:
+                nodes.append(TextNode(text[code_start:idx], "code" if code else "text"))
+            code = not code
+            code_start = end
+
+    # The final part at every level is kept even when empty
+    if bold:
+        nodes.append(TextNode(text[part_start:], "bold"))
+    elif italic:
+        nodes.append(TextNode(text[italic_start:], "italic"))
+    else:
+        nodes.append(TextNode(text[code_start:], "code" if code else "text"))
 
-    return nodes
 
-def markdown_to_blocks(markdown):
+def _tokenize_links(text, start, end, nodes):
     """
-    Splits the markdown text into individual blocks separated by blank lines.
-    :param markdown: A raw markdown string.
-    :return: A list of non-empty, trimmed block strings.
+    Emits the link nodes in text[start:end] and tokenizes the text between them.
+    Empty gaps around links are dropped.
     """
-    # Split the markdown string by double newlines to get potential blocks
-    raw_blocks = markdown.split('\n\n')
+    for match in LINK_PATTERN.finditer(text, start, end):
+        if match.start() > start:
+            _tokenize_delimiters(text[start:match.start()], nodes)
+        nodes.append(TextNode(match.group(1), "link", match.group(2)))
+        start = match.end()
+    if start < end:
+        _tokenize_delimiters(text[start:end], nodes)
 
-    # Strip leading/trailing whitespace from each block and remove empty blocks
-    blocks = [block.strip() for block in raw_blocks if block.strip()]
 
-    return blocks
-
-def block_to_block_type(block):
+def text_to_textnodes(text):
     """
-    Determines the type of a markdown block based on its content.
-    :param block: A single block of markdown text (stripped of leading/trailing whitespace).
-    :return: A string representing the block type.
+    Converts markdown text into a list of TextNode objects based on formatting such as bold, italic, code, images, and links.
+    Produces the same nodes as applying split_nodes_image, split_nodes_link and
+    split_nodes_delimiter for "**", "*" and "`" in turn, but in a single left-to-right
+    pass without building the intermediate node lists.
+    :param text: A string containing markdown text.
+    :return: A list of TextNode objects.
     """
+    if not text:
+        return [TextNode(text, "text")]
 
-    # Check for headings (1-6 # characters followed by a space)
-    if block.startswith("#"):
-        if 1 <= len(block.split(' ')[0]) <= 6 and block.split(' ')[0].startswith("#"):
-            return "heading"
-
-    # Check for code blocks (start and end with 3 backticks)
-    if block.startswith("```") and block.endswith("```"):
-        return "code"
+    nodes = []
+    start_idx = 0
 
-    # Check for quote blocks (every line starts with '>')
-    if all(line.startswith(">") for line in block.splitlines()):
-        return "quote"
+    # Images take precedence over links that would overlap them, so they are
+    # matched first and links are only looked for in the gaps between images.
+    for match in IMAGE_PATTERN.finditer(text):
+        if match.start() > start_idx:
+            _tokenize_links(text, start_idx, match.start(), nodes)
+        nodes.append(TextNode(match.group(1), "image", match.group(2)))
+        start_idx = match.end()
 
-    # Check for unordered list blocks (every line starts with * or - followed by a space)
-    if all(line.startswith("* ") or line.startswith("- ") for line in block.splitlines()):
-        return "unordered_list"
-
-    # Check for ordered list blocks (every line starts with a number followed by . and a space)
-    lines = block.splitlines()
-    if all(line.lstrip().startswith(f"{i}. ") for i, line in enumerate(lines, 1)):
-        return "ordered_list"
-
-    # If none of the above, it's a paragraph
-    return "paragraph"
\ No newline at end of file
+    _tokenize_links(text, start_idx, len(text), nodes)
+    return nodes